@@ -0,0 +1,109 @@
+import numpy as np
+from Amortizer import equal_monthly_payment, outstanding_balance
+from Income import Budget
+from Solver import bracket_roots
+
+
+class Affordability_Solver(object):
+    """
+    Finds the largest home price, or the smallest down payment, whose monthly housing
+    cost (loan payment, PMI and other fixed payments, as in Amortizer) stays within
+    max_housing_cost_perc of the monthly income in every month of the loan. Income comes
+    from Budget, the k-th loan payment is paid from the k-th month of income.
+    """
+    def __init__(self,
+                 monthly_net_income,
+                 expected_annual_salary_increase_perc,
+                 max_housing_cost_perc,
+                 home_loan_interest_perc,
+                 home_loan_years,
+                 pmi_monthly_amt=0.,
+                 other_fixed_monthly_payments=0.,
+                 raise_frequency='annual',
+    ):
+        income = Budget(monthly_net_income=monthly_net_income,
+                        expected_annual_salary_increase_perc=expected_annual_salary_increase_perc,
+                        years=home_loan_years,
+                        raise_frequency=raise_frequency).schedule_arrays()['Monthly Income']
+        self.housing_budget = income * max_housing_cost_perc / 100
+        self.loan_periods = int(home_loan_years) * 12
+        self.monthly_rt = home_loan_interest_perc / 100 / 12
+        self.pmi_monthly_amt = pmi_monthly_amt
+        self.other_monthly_pmts = other_fixed_monthly_payments
+
+        # The cost only steps down once, when PMI ends, so the tightest month is the lowest
+        # budget before that step or after it. Index k: the first k payments / the rest.
+        budget = self.housing_budget
+        self._lowest_first = np.concatenate([[np.inf], np.minimum.accumulate(budget)])
+        self._lowest_after = np.concatenate([np.minimum.accumulate(budget[::-1])[::-1], [np.inf]])
+
+    def pmi_months(self, loan_amount, EMI, pmi_threshold):
+        """
+        Number of payments made while the balance is above pmi_threshold, from the closed
+        form balance instead of a schedule. Broadcasts its arguments.
+        """
+        loan_amount, EMI, pmi_threshold = np.broadcast_arrays(np.asarray(loan_amount, dtype=float),
+                                                              np.asarray(EMI, dtype=float),
+                                                              np.asarray(pmi_threshold, dtype=float))
+        r, n = self.monthly_rt, self.loan_periods
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if r == 0:
+                crossing = (loan_amount - pmi_threshold) / EMI
+            else:
+                # balance(m) = A - (A - loan) * (1+r)**m with A = EMI / r
+                A = EMI / r
+                crossing = np.log((A - pmi_threshold) / (A - loan_amount)) / np.log1p(r)
+        paid_down = np.where(loan_amount > pmi_threshold, np.clip(np.ceil(np.nan_to_num(crossing, nan=n)), 1, n), 0)
+
+        # First month at or under the threshold, corrected to the balance rounded to cents
+        prev_balance = outstanding_balance(loan_amount, r, EMI, np.maximum(paid_down - 1, 0))
+        paid_down = np.where((paid_down > 1) & (prev_balance <= pmi_threshold), paid_down - 1, paid_down)
+        balance = outstanding_balance(loan_amount, r, EMI, paid_down)
+        paid_down = np.where((paid_down > 0) & (paid_down < n) & (balance > pmi_threshold), paid_down + 1, paid_down)
+        return np.maximum(paid_down - 1, 0).astype(int)
+
+    def slack(self, home_price, down_payment):
+        """
+        Housing budget left in the tightest month of the loan, negative when some month
+        costs more than the budget. Broadcasts home_price against down_payment.
+        """
+        home_price, down_payment = np.broadcast_arrays(np.asarray(home_price, dtype=float),
+                                                       np.asarray(down_payment, dtype=float))
+        loan_amount = np.maximum(home_price - down_payment, 0)
+        EMI = equal_monthly_payment(loan_amount, self.monthly_rt, self.loan_periods)
+        k = self.pmi_months(loan_amount, EMI, home_price * 0.80)
+        with_pmi = self._lowest_first[k] - (EMI + self.pmi_monthly_amt + self.other_monthly_pmts)
+        without_pmi = self._lowest_after[k] - (EMI + self.other_monthly_pmts)
+        return np.minimum(with_pmi, without_pmi)
+
+    def max_home_price(self, down_payment):
+        """
+        Largest whole dollar home price affordable with down_payment (scalar or array), NaN
+        when even a price equal to the down payment isn't (the other payments alone are
+        over budget)
+        """
+        down_payment = np.array(down_payment, dtype=float, ndmin=1)
+        # A loan whose payment alone exceeds the largest monthly budget can't be afforded
+        per_dollar = equal_monthly_payment(1_000_000., self.monthly_rt, self.loan_periods) / 1_000_000
+        upper = down_payment + self.housing_budget.max() / per_dollar * 1.01 + 100
+
+        root = bracket_roots(lambda c: self.slack(c, down_payment[:, None]), down_payment, upper, tol=0.01)
+        price = np.floor(root)
+        # Interpolation can land a hair past a PMI jump, step back onto the affordable side
+        price = np.where(self.slack(price, down_payment) < 0, price - 1, price)
+        return price.item() if price.size == 1 else price
+
+    def min_down_payment(self, home_price):
+        """
+        Smallest whole dollar down payment making home_price (scalar or array) affordable,
+        NaN when even paying the whole price upfront isn't
+        """
+        home_price = np.array(home_price, dtype=float, ndmin=1)
+        lower = np.zeros(len(home_price))
+
+        root = bracket_roots(lambda c: self.slack(home_price[:, None], c), lower, home_price, tol=0.01)
+        down_payment = np.minimum(np.ceil(root), home_price)
+        down_payment = np.where(self.slack(home_price, down_payment) < 0, down_payment + 1, down_payment)
+        # No sign change because no down payment is needed at all
+        down_payment = np.where(self.slack(home_price, lower) >= 0, 0., down_payment)
+        return down_payment.item() if down_payment.size == 1 else down_payment
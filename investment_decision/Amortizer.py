@@ -1,4 +1,174 @@
+import numpy as np
 import pandas as pd
+from compounding import step_growth
+
+
+def equal_monthly_payment(loan_amount, monthly_rt, loan_periods):
+    """
+    Equal Monthly Installments (EMI) rounded to cents.
+    Accepts scalars or numpy arrays, arrays are broadcast against each other.
+    """
+    loan_amount, monthly_rt, loan_periods = np.broadcast_arrays(np.asarray(loan_amount, dtype=float),
+                                                                np.asarray(monthly_rt, dtype=float),
+                                                                np.asarray(loan_periods, dtype=float))
+    growth = (1+monthly_rt) ** loan_periods
+    with np.errstate(divide='ignore', invalid='ignore'):
+        EMI = np.where(monthly_rt == 0.,
+                       loan_amount / loan_periods,
+                       loan_amount * (monthly_rt * growth / (growth - 1)))
+
+    EMI = np.round(EMI, 2)
+    return EMI.item() if EMI.ndim == 0 else EMI
+
+
+def outstanding_balance(loan_amount, monthly_rt, EMI, months):
+    """
+    Closed form loan balance after `months` equal payments, floored at zero.
+    Accepts scalars or numpy arrays, arrays are broadcast against each other.
+    """
+    loan_amount = np.asarray(loan_amount, dtype=float)
+    monthly_rt = np.asarray(monthly_rt, dtype=float)
+    growth = (1+monthly_rt) ** months
+    with np.errstate(divide='ignore', invalid='ignore'):
+        paid_down = np.where(monthly_rt == 0.,
+                             EMI * months,
+                             EMI * (growth - 1) / monthly_rt)
+
+    return np.round(np.maximum(0, loan_amount * growth - paid_down), 2)
+
+
+# Exact mode takes annual rates to 1/10_000 of a percent, so the monthly rate is the
+# integer fraction rate_units / (1200 * RATE_SCALE)
+RATE_SCALE = 10_000
+
+
+def divide_half_even(numerator, denominator):
+    """
+    numerator / denominator rounded half to even (bank rounding), exact on int64 arrays
+    of non-negative numerators
+    """
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    return quotient + ((twice > denominator) | ((twice == denominator) & (quotient % 2 == 1)))
+
+
+def amortize_cents(loan_cents, annual_rate_perc, loan_periods, max_iter=None):
+    """
+    Exact fixed payment schedule in int64 cents. Every month's interest is rounded half
+    to even from the previous balance, the payment is the EMI in cents and the last
+    payment (or the one that pays the loan off early) is whatever clears it, so the
+    balance ends at exactly 0.
+
+    The rounded recurrence has no closed form, so it is solved as a fixed point on whole
+    arrays: interest from the balances, balances from the cumsum of payment minus
+    interest, repeated until the balances stop changing. The float closed form is the
+    first guess, and since month k only depends on earlier months it converges in at most
+    loan_periods + 1 rounds. In practice the count grows with the term: up to 4 rounds
+    for 5 year loans, 6 for 15 years and 13 for 30 years. A batch takes as many as its
+    slowest loan, but each round only recomputes the loans still changing.
+
+    loan_cents, annual_rate_perc: scalars or 1-D arrays (one loan per element)
+    Returns balance, payment and interest int64 arrays of shape (..., loan_periods+1).
+    """
+    scalar = np.ndim(loan_cents) == 0 and np.ndim(annual_rate_perc) == 0
+    loan_cents, annual_rate_perc = np.broadcast_arrays(np.atleast_1d(loan_cents), np.atleast_1d(annual_rate_perc))
+    loan_cents = np.maximum(loan_cents.astype(np.int64), 0)[:, None]
+    rate_units = np.round(annual_rate_perc * RATE_SCALE).astype(np.int64)[:, None]
+    denominator = 1200 * RATE_SCALE
+    monthly_rt = rate_units / denominator
+
+    EMI = np.round(np.asarray(equal_monthly_payment(loan_cents, monthly_rt, loan_periods))).astype(np.int64)
+    months = np.arange(loan_periods + 1)
+    balance = np.round(outstanding_balance(loan_cents, monthly_rt, EMI, months)).astype(np.int64)
+
+    interest = np.zeros(balance.shape, dtype=np.int64)
+    # Loans whose balances still changed in the last round, the others have converged.
+    # Balances before the first month that changed are final, so each round starts there.
+    rows = np.arange(len(balance))
+    start = 1
+    for _ in range(max_iter or loan_periods + 1):
+        previous = balance[rows, start-1:]
+        row_interest = divide_half_even(previous[:, :-1] * rate_units[rows], denominator)
+
+        raw = previous[:, :1] - np.cumsum(EMI[rows] - row_interest, axis=1)
+        # From the first month the balance would reach zero on, the loan is paid off
+        paid_off = np.logical_or.accumulate(raw <= 0, axis=1)
+        paid_off[:, -1] = True
+        new_balance = np.where(paid_off, 0, raw)
+
+        interest[rows, start:] = row_interest
+        balance[rows, start:] = new_balance
+        changed = new_balance != previous[:, 1:]
+        still_changing = changed.any(axis=1)
+        if not still_changing.any():
+            break
+        rows = rows[still_changing]
+        start += int(changed[still_changing].argmax(axis=1).min()) + 1
+        if start > loan_periods:
+            break
+
+    payment = np.zeros(balance.shape, dtype=np.int64)
+    payment[:, 1:] = balance[:, :-1] + interest[:, 1:] - balance[:, 1:]
+    if scalar:
+        return balance[0], payment[0], interest[0]
+    return balance, payment, interest
+
+
+LOAN_EVENT_KINDS = ('prepayment', 'extra_principal', 'recast', 'refinance')
+
+
+class Loan_Event(object):
+    """
+    One change to the loan, applied after the regular payment of `month`.
+        prepayment: lump sum `amount`, the payment stays the same so the term shortens
+        extra_principal: `amount` on top of the payment in every month from `month`
+            through `end_month` (until paid off when None)
+        recast: optional lump sum `amount`, then the payment is re-amortized over the
+            remaining term at the same rate
+        refinance: the balance plus closing `cost` (rolled into the loan) is re-amortized
+            at `rate_perc` over `years`
+    """
+    def __init__(self, kind, month, amount=0., end_month=None, rate_perc=None, years=None, cost=0.):
+        if kind not in LOAN_EVENT_KINDS:
+            raise ValueError(f"Unknown loan event {kind!r}, choose one of {LOAN_EVENT_KINDS}")
+        if int(month) != month or month < 1:
+            raise ValueError(f"Loan event month must be a whole number >= 1, got {month}")
+        if amount < 0 or cost < 0:
+            raise ValueError("Loan event amount and cost can't be negative")
+        if kind == 'extra_principal' and end_month is not None and end_month < month:
+            raise ValueError("extra_principal end_month is before its month")
+        if kind == 'refinance' and (rate_perc is None or not years or years < 0):
+            raise ValueError("refinance needs rate_perc and a positive number of years")
+
+        self.kind = kind
+        self.month = int(month)
+        self.amount = float(amount)
+        self.end_month = None if end_month is None else int(end_month)
+        self.rate_perc = None if rate_perc is None else float(rate_perc)
+        self.years = None if years is None else int(years)
+        self.cost = float(cost)
+
+    def key(self):
+        return (self.kind, self.month, self.amount, self.end_month, self.rate_perc, self.years, self.cost)
+
+    def __eq__(self, other):
+        return isinstance(other, Loan_Event) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"Loan_Event{self.key()}"
+
+
+def normalize_events(events):
+    """
+    Sorted tuple of Loan_Event from Loan_Events or dicts of their arguments, so equal
+    event schedules compare and hash equal. ex: [{'kind': 'prepayment', 'month': 24, 'amount': 10_000}]
+    """
+    events = [e if isinstance(e, Loan_Event) else Loan_Event(**e) for e in (events or ())]
+    return tuple(sorted(events, key=lambda e: (e.month, LOAN_EVENT_KINDS.index(e.kind))))
+
 
 class Amortizer(object):
     def __init__(self, 
@@ -9,8 +179,28 @@ class Amortizer(object):
                  loan_interest_perc, 
                  loan_terms_years,
                  annual_home_appreciation_perc,
+                 events=None,
+                 appreciation_frequency='monthly',
+                 exact_cents=False,
+                 dtype=np.float64,
+                 start_date=None,
     ):
-        
+        """
+        appreciation_frequency: how often the home value steps up by its share of
+        annual_home_appreciation_perc, one of compounding.FREQUENCIES
+        events: optional Loan_Events (or dicts of their arguments) for prepayments,
+        recurring extra principal, recasts and refinances
+        exact_cents: compute the schedule in int64 cents with bank rounding and a final
+        payment that clears the loan exactly, see amortize_cents
+        dtype: float type of the schedule's money columns, np.float32 halves memory
+        start_date: first month of the schedule, the current month when None
+        """
+        self.events = normalize_events(events)
+        self.exact_cents = exact_cents
+        if exact_cents and self.events:
+            raise ValueError("exact_cents doesn't support loan events")
+        self._event_arrays = None
+        self.dtype = np.dtype(dtype)
         self.loan_amount = home_price - down_payment_amt
         self.down_payment = down_payment_amt
         self.home_value = home_price
@@ -19,13 +209,15 @@ class Amortizer(object):
         
         self.loan_rt = loan_interest_perc / 100
         self.monthly_rt = self.loan_rt / 12
-        self.appreciation_monthly_rate = annual_home_appreciation_perc / 100 / 12
+        self.appreciation_rate = annual_home_appreciation_perc / 100
+        self.appreciation_frequency = appreciation_frequency
 
         self.loan_terms_years = loan_terms_years
         self.loan_periods = self.loan_terms_years * 12
 
 
-        start_date = pd.Timestamp('today').replace(day=1).date()
+        if start_date is None:
+            start_date = pd.Timestamp('today').replace(day=1).date()
         self.date_range = pd.date_range(start=start_date,
                                         periods=self.loan_periods+1,
                                         freq='MS')
@@ -34,16 +226,7 @@ class Amortizer(object):
         """
         Uses class attributes, no parameters
         """
-        numerator = self.monthly_rt * (1+self.monthly_rt) ** self.loan_periods
-        denominator = ( (1+self.monthly_rt)**self.loan_periods) - 1
-        
-        #Equal Monthly Installments (EMI)
-        if self.monthly_rt == 0.:
-            EMI = self.loan_amount/self.loan_periods
-        else:
-            EMI = self.loan_amount * (numerator/denominator)
-
-        return round(EMI, 2)
+        return equal_monthly_payment(self.loan_amount, self.monthly_rt, self.loan_periods)
     
     def calc_interest_amt(self, outstanding_loan_amt, monthly_rate):
         return round(outstanding_loan_amt * monthly_rate, 2)
@@ -53,78 +236,183 @@ class Amortizer(object):
 
         return round(ret, 2)
 
-    def schedule(self):
+    def home_value_at(self, months):
+        """
+        Expected home value after `months` months (scalar or array), closed form
+        """
+        return np.round(self.home_value * step_growth(self.appreciation_rate, months, self.appreciation_frequency), 2)
+
+    def _plain_loan_arrays(self):
+        """
+        Balance, scheduled payment, extra principal and interest per month without events
+        """
         EMI = self._calc_equal_monthly_payments()
-        
-        data = []
-        for i, date in enumerate(self.date_range):
-            if i == 0:
-                balance = self.loan_amount
-                interest = 0.00
-                principal = 0.00
-                home_market_value = self.home_value
-                
-                row = {
-                    'Date': date,
-                    'Home Outstanding Balance': balance,
-                    'Home Payment Amount': 0.00,
-                    'Home Interest Payment': interest,
-                    'Home Principal Payment': principal,
-                    'Home PMI Payment': 0.00, #no payment first month
-                    'Home Oth. Fixed Payments': 0.00, #no payment first month
-                    'Home Total Monthly Payments': 0.00,
-                    'Home Cumulative Interest Paid': 0.00,
-                    'Home Cumulative Principal Paid': 0.00,
-                    'Home Cumulative PMI Paid': 0.00,
-                    'Home Cumulative Total Payments': 0.00,
-                    'Home Expected Value': home_market_value,
-                    'Home Expected Equity': home_market_value - balance
-                }
+        months = np.arange(self.loan_periods + 1)
+
+        balance = outstanding_balance(self.loan_amount, self.monthly_rt, EMI, months)
+        # Month 0 is the purchase month, no payments are made
+        interest = np.zeros(months.shape)
+        interest[1:] = np.round(balance[:-1] * self.monthly_rt, 2)
+        payment = np.where(months > 0, EMI, 0.00)
+        return balance, payment, np.zeros(months.shape), interest
+
+    def _event_boundaries(self, horizon):
+        """
+        Months after which the payment, rate or extra principal can change
+        """
+        ret = {0, horizon}
+        for e in self.events:
+            ret.add(min(e.month, horizon))
+            if e.kind == 'extra_principal':
+                ret.add(e.month - 1)
+                if e.end_month is not None:
+                    ret.add(min(e.end_month, horizon))
+        return sorted(ret)
+
+    def _event_loan_arrays(self):
+        """
+        Same arrays as _plain_loan_arrays with the events applied, until the loan is paid
+        off even when a refinance runs past the schedule. Between two event months the
+        rate, payment and extra principal are constant, so each segment is one closed
+        form evaluation and the cost grows with the number of events, not of months.
+        """
+        if self._event_arrays is not None:
+            return self._event_arrays
+
+        # +1 month pays off the cents the rounded payment can leave at the end of a term
+        horizon = max([self.loan_periods] + [e.month + e.years * 12 for e in self.events if e.kind == 'refinance']) + 1
+        balance = np.zeros(horizon + 1)
+        payment = np.zeros(horizon + 1)
+        extra = np.zeros(horizon + 1)
+        interest = np.zeros(horizon + 1)
+
+        B = balance[0] = self.loan_amount
+        rate, EMI, term_end = self.monthly_rt, self._calc_equal_monthly_payments(), self.loan_periods
+        bounds = self._event_boundaries(horizon)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            recurring = sum(e.amount for e in self.events if e.kind == 'extra_principal'
+                            and e.month <= start + 1 and (e.end_month is None or e.end_month > start))
+            if B > 0:
+                j = np.arange(1, end - start + 1)
+                growth = (1+rate) ** j
+                paid_down = (EMI + recurring) * (growth - 1) / rate if rate else (EMI + recurring) * j
+                seg_balance = np.round(np.maximum(0, B * growth - paid_down), 2)
+
+                previous = np.concatenate([[B], seg_balance[:-1]])
+                seg_interest = np.round(previous * rate, 2)
+                # The last payment only covers what is left
+                seg_payment = np.minimum(EMI, previous + seg_interest)
+                balance[start+1:end+1] = seg_balance
+                interest[start+1:end+1] = seg_interest
+                payment[start+1:end+1] = seg_payment
+                extra[start+1:end+1] = np.minimum(recurring, previous + seg_interest - seg_payment)
+                B = seg_balance[-1]
+
+            for e in self.events:
+                if e.month != end:
+                    continue
+                if e.kind in ('prepayment', 'recast'):
+                    lump = min(e.amount, B)
+                    extra[end] += lump
+                    B = round(B - lump, 2)
+                if e.kind == 'recast' and B > 0:
+                    EMI = equal_monthly_payment(B, rate, max(term_end - end, 1))
+                if e.kind == 'refinance' and B > 0:
+                    B = B + e.cost
+                    rate, term_end = e.rate_perc / 100 / 12, end + e.years * 12
+                    EMI = equal_monthly_payment(B, rate, e.years * 12)
+            balance[end] = B
+
+        self._event_arrays = balance, payment, extra, interest
+        return self._event_arrays
+
+    def payoff_summary(self):
+        """
+        Payoff month and date of the loan with its events, total interest over the life
+        of the loan and the interest saved against the plain schedule.
+        """
+        plain_interest = self._plain_loan_arrays()[3].sum()
+        if not self.events:
+            balance, interest = None, plain_interest
+            payoff_month = self.loan_periods
+        else:
+            balance, _, _, interest_arr = self._event_loan_arrays()
+            interest = interest_arr.sum()
+            paid_off = np.flatnonzero(balance <= 0)
+            payoff_month = int(paid_off[0]) if len(paid_off) else None
+
+        return {
+            'Payoff Month': payoff_month,
+            'Payoff Date': None if payoff_month is None else self.date_range[0] + pd.DateOffset(months=payoff_month),
+            'Total Interest': round(float(interest), 2),
+            'Interest Saved': round(float(plain_interest - interest), 2),
+        }
+
+    def schedule_arrays(self, as_cents=False):
+        """
+        Schedule columns as numpy arrays, without building a DataFrame. Balances and
+        home values come from their closed forms (piecewise between loan events) and the
+        cumulative columns from cumsum, so the whole schedule is O(n) with no per-month
+        python loop.
+        Matches the row by row loop it replaced (tests/test_amortizer.py) within the
+        loop's rounding: the loop rounded every month's interest and home value to cents
+        and carried the error, so values differ by at most half a cent per month
+        compounded at the monthly rate, ex: under $5 at the end of a 30 year loan at 15%.
+        as_cents: with exact_cents, return the money columns as the int64 cents they are
+        computed in instead of dollars
+        """
+        n = self.loan_periods + 1
+        months = np.arange(n)
+        if as_cents and not self.exact_cents:
+            raise ValueError("as_cents needs an Amortizer built with exact_cents=True")
+
+        if self.exact_cents:
+            balance, payment, interest = amortize_cents(round(self.loan_amount * 100), self.loan_rt * 100, self.loan_periods)
+            extra = np.zeros(n, dtype=np.int64)
+            home_market_value = np.round(self.home_value_at(months) * 100).astype(np.int64)
+            pmi_amt, other_amt = round(self.pmi_monthly_amt * 100), round(self.other_monthly_pmts * 100)
+            pmi_threshold = self.home_value * 80
+        else:
+            if self.events:
+                balance, payment, extra, interest = (a[:n] for a in self._event_loan_arrays())
             else:
-                interest = self.calc_interest_amt(balance, monthly_rate=self.monthly_rt)
-                principal = EMI - interest
-                balance = max(0, balance - principal)
-                home_market_value = round(home_market_value * (1+self.appreciation_monthly_rate), 2)
-                
-                if balance <= self.home_value * 0.80:
-                    pmi = 0.00
-                else:
-                    pmi = self.pmi_monthly_amt
-                
-                total_payments_for_month = EMI + pmi + self.other_monthly_pmts
-
-                cumu_interest_paid = sum(i['Home Interest Payment'] for i in data) + interest
-                cumu_principal_paid = sum(i['Home Principal Payment'] for i in data) + principal
-                cumu_pmi_paid = sum(i['Home PMI Payment'] for i in data) + pmi
-                cumu_other_fixed_payments = sum(i['Home Oth. Fixed Payments'] for i in data) + self.other_monthly_pmts
-                cumu_total_payments = cumu_interest_paid + cumu_principal_paid + cumu_pmi_paid + cumu_other_fixed_payments
-
-                row = {
-                    'Date': date,
-                    'Home Outstanding Balance': balance,
-                    'Home Payment Amount': EMI,
-                    'Home Interest Payment': interest,
-                    'Home Principal Payment': principal,
-                    'Home PMI Payment': pmi,
-                    'Home Oth. Fixed Payments': self.other_monthly_pmts,
-                    'Home Total Monthly Payments': total_payments_for_month,
-                    'Home Cumulative Interest Paid': cumu_interest_paid,
-                    'Home Cumulative Principal Paid': cumu_principal_paid,
-                    'Home Cumulative PMI Paid': cumu_pmi_paid,
-                    'Home Cumulative Total Payments': cumu_total_payments,
-                    'Home Expected Value': home_market_value,
-                    'Home Expected Equity': home_market_value - balance,
-                }
-            data.append(row)
-
-        return pd.DataFrame(data)
-    
+                balance, payment, extra, interest = self._plain_loan_arrays()
+            home_market_value = self.home_value_at(months)
+            pmi_amt, other_amt = self.pmi_monthly_amt, self.other_monthly_pmts
+            pmi_threshold = self.home_value * 0.80
 
-a = Amortizer(300_000,
-              15_000,
-              308,
-              250,
-              15,
-              30,
-              6)
-a.schedule()
\ No newline at end of file
+        paying = months > 0
+        principal = payment + extra - interest
+        pmi = np.where(paying & (balance > pmi_threshold), pmi_amt, 0)
+        other = np.where(paying, other_amt, 0)
+
+        cumu_interest_paid = np.cumsum(interest)
+        cumu_principal_paid = np.cumsum(principal)
+        cumu_pmi_paid = np.cumsum(pmi)
+        cumu_other_fixed_payments = np.cumsum(other)
+
+        ret = {
+            'Home Outstanding Balance': balance,
+            'Home Payment Amount': payment,
+            'Home Interest Payment': interest,
+            'Home Principal Payment': principal,
+            'Home Extra Principal Payment': extra,
+            'Home PMI Payment': pmi, #no payment first month
+            'Home Oth. Fixed Payments': other, #no payment first month
+            'Home Total Monthly Payments': payment + extra + pmi + other,
+            'Home Cumulative Interest Paid': cumu_interest_paid,
+            'Home Cumulative Principal Paid': cumu_principal_paid,
+            'Home Cumulative PMI Paid': cumu_pmi_paid,
+            'Home Cumulative Total Payments': cumu_interest_paid + cumu_principal_paid + cumu_pmi_paid + cumu_other_fixed_payments,
+            'Home Expected Value': home_market_value,
+            'Home Expected Equity': home_market_value - balance,
+        }
+        if as_cents:
+            return {'Date': self.date_range.values, **ret}
+        if self.exact_cents:
+            ret = {k: v / 100 for k, v in ret.items()}
+        # Computed in float64 and only then stored as dtype, so compact mode doesn't compound float32 error
+        return {'Date': self.date_range.values, **{k: v.astype(self.dtype, copy=False) for k, v in ret.items()}}
+
+    def schedule(self):
+        return pd.DataFrame(self.schedule_arrays(), copy=False)
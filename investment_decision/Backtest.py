@@ -0,0 +1,172 @@
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from Scenarios import SCENARIO_INPUTS, evaluate_scenarios
+
+# Monthly history, one row per month with no gaps. Returns are decimals for the month,
+# ex: 0.012 for +1.2%. Home Price Return may be empty for months without home data
+# (ex: before a home price index starts), windows over those months are skipped.
+# No history is bundled, the caller provides one, ex: built from Robert Shiller's S&P 500
+# total return data and the S&P/Case-Shiller U.S. National Home Price Index.
+HISTORY_COLUMNS = ('Date', 'Investment Return', 'Home Price Return')
+
+
+def load_historical_returns(path):
+    """
+    Reads a CSV or Parquet file (a path or an uploaded file) with HISTORY_COLUMNS, sorted
+    by month. Date can be any date inside the month, ex: 1990-01 or 1990-01-31.
+    """
+    if os.path.splitext(str(getattr(path, 'name', path)))[1].lower() in ('.parquet', '.pq'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+
+    missing = set(HISTORY_COLUMNS) - set(df.columns)
+    if missing:
+        raise ValueError(f"Historical returns are missing columns: {sorted(missing)}")
+
+    df = df[list(HISTORY_COLUMNS)].copy()
+    months = pd.to_datetime(df['Date']).dt.to_period('M')
+    df = df.assign(Date=months.dt.to_timestamp()).iloc[np.argsort(months.to_numpy(), kind='stable')]
+    steps = np.diff(months.sort_values().astype('int64').to_numpy())
+    if len(steps) and (steps != 1).any():
+        raise ValueError("Historical returns must have exactly one row per month, without gaps")
+
+    for name in HISTORY_COLUMNS[1:]:
+        df[name] = pd.to_numeric(df[name], errors='coerce')
+    if df['Investment Return'].isna().any():
+        raise ValueError("Investment Return can't have empty months")
+    if (df[list(HISTORY_COLUMNS[1:])] <= -1).any().any():
+        raise ValueError("Monthly returns must be above -1 (a total loss)")
+    return df.reset_index(drop=True)
+
+
+class Historical_Backtest(object):
+    """
+    Runs the buy vs invest comparison once for every historical start month, with the
+    investment earning the historical monthly returns instead of a fixed rate and, with
+    use_home_history, the home appreciating with the historical home price changes.
+    Rent and the loan keep their fixed inputs.
+
+    Each start month is a window of loan_periods + 1 months over the return series,
+    taken as a sliding_window_view, and every window is evaluated in one vectorized
+    evaluate_scenarios call. Contiguous start months (every run, unless the home price
+    history has gaps in the middle) are a slice of the view, so the returns aren't copied
+    per window. The cumulative growth evaluate_scenarios builds is still one
+    (windows x months) array per series.
+    """
+    def __init__(self,
+                 history,
+                 home_price,
+                 home_down_payment,
+                 home_loan_interest_perc,
+                 pmi_monthly_amt,
+                 home_loan_years,
+                 initial_additional_home_expenses,
+                 annual_home_appreciation_perc,
+                 other_fixed_monthly_payments,
+                 annual_investment_growth_perc,
+                 monthly_rent_amt,
+                 annual_rent_appreciation_perc,
+                 use_home_history=True,
+    ):
+        """
+        history: DataFrame from load_historical_returns
+        annual_investment_growth_perc is unused, the history replaces it. It is accepted
+        so the backtest takes the same inputs as Compare_Investments.
+        """
+        values = locals()
+        self.inputs = {name: float(values[name]) for name in SCENARIO_INPUTS}
+        self.loan_periods = int(home_loan_years) * 12
+        self.use_home_history = use_home_history
+        self.history = history
+
+        n_months = len(history) - self.loan_periods
+        if n_months < 1:
+            raise ValueError(f"{len(history)} months of history can't cover a {self.loan_periods + 1} month loan")
+
+        window = self.loan_periods + 1
+        self._investment_growth = sliding_window_view(1 + history['Investment Return'].to_numpy(dtype=float), window)
+        self._home_growth = None
+        if use_home_history:
+            home_growth = 1 + history['Home Price Return'].to_numpy(dtype=float)
+            self._home_growth = sliding_window_view(home_growth, window)
+            # Month 0 of a window is the purchase month, its home price change isn't used
+            complete = ~sliding_window_view(np.isnan(home_growth[1:]), window - 1).any(axis=1)
+            self.starts = np.flatnonzero(complete[:n_months])
+        else:
+            self.starts = np.arange(n_months)
+
+        self.results_df = pd.DataFrame({})
+
+    @staticmethod
+    def _windows(view, starts):
+        """
+        Windows of the sliding_window_view at starts. Fancy indexing would copy every
+        window, a run of consecutive starts is sliced instead.
+        """
+        if len(starts) and (np.diff(starts) == 1).all():
+            return view[starts[0]:starts[-1] + 1]
+        return view[starts]
+
+    def _evaluate(self, starts, keep_schedules=False):
+        home_growth = None if self._home_growth is None else self._windows(self._home_growth, starts)
+        return evaluate_scenarios({name: np.full(len(starts), value) for name, value in self.inputs.items()},
+                                  self.loan_periods, keep_schedules=keep_schedules,
+                                  investment_growth=self._windows(self._investment_growth, starts),
+                                  home_growth=home_growth)
+
+    def run(self):
+        """
+        Returns one row per start month: final home equity, final investment balance,
+        their difference and the verdict
+        """
+        if not len(self.starts):
+            raise ValueError("No start month has complete history for the whole loan")
+
+        res = self._evaluate(self.starts)
+        dates = self.history['Date'].to_numpy()
+        delta = res['Final Home Equity'] - res['Final Investment Balance']
+        self.results_df = pd.DataFrame({
+            'Start': dates[self.starts],
+            'End': dates[self.starts + self.loan_periods],
+            'Final Home Equity': res['Final Home Equity'],
+            'Final Investment Balance': res['Final Investment Balance'],
+            'Delta': delta,
+            'Verdict': np.where(delta > 0, 'Home', np.where(delta < 0, 'Investing', 'Tie')),
+        })
+        return self.results_df
+
+    @property
+    def probability_home_wins(self):
+        return float((self.results_df['Delta'] > 0).mean())
+
+    def extremes(self):
+        """
+        The worst, median and best start months for buying (lowest, median and highest
+        Delta), as rows of the results
+        """
+        df = self.results_df if len(self.results_df) else self.run()
+        order = np.argsort(df['Delta'].to_numpy(), kind='stable')
+        ret = df.iloc[[order[0], order[len(order) // 2], order[-1]]]
+        return ret.set_axis(['Worst', 'Median', 'Best']).rename_axis('Start for buying')
+
+    def schedules(self, start_dates):
+        """
+        Month by month home equity and investment balance of the windows starting at
+        start_dates, as {start date: DataFrame}
+        """
+        dates = self.history['Date'].to_numpy()
+        positions = np.searchsorted(dates, np.asarray(start_dates, dtype=dates.dtype))
+        res = self._evaluate(positions, keep_schedules=True)
+
+        ret = {}
+        for i, position in enumerate(positions):
+            ret[pd.Timestamp(dates[position])] = pd.DataFrame({
+                'Date': dates[position:position + self.loan_periods + 1],
+                'Home Expected Equity': res['Home Expected Equity'][i],
+                'Investment Balance at End of Month': res['Investment Balance at End of Month'][i],
+            })
+        return ret
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_key(namespace, inputs, digits=6):
+    """
+    Hashable cache key from a dict of inputs. Numbers are rounded so 4.5 and 4.50000001
+    (or 30 and 30.0) share an entry, and the order of the inputs does not matter.
+    """
+    items = []
+    for name, value in sorted(inputs.items()):
+        if isinstance(value, (int, float)):
+            value = round(float(value), digits)
+        items.append((name, value))
+    return (namespace, tuple(items))
+
+
+class LRU_Cache(object):
+    """
+    Thread safe least-recently-used cache with an optional time to live.
+    Hit, miss and eviction counters are kept so the size can be tuned.
+    """
+    def __init__(self, max_size=256, ttl_seconds=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._data = OrderedDict() # key -> (expires at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, calling compute() on a miss.
+        compute runs outside the lock so slow schedules don't block other sessions.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.,
+            }
@@ -0,0 +1,113 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from Cache import normalize_key
+
+
+class Run_History(object):
+    """
+    The last runs of a session in compact form: the inputs, the start month and the
+    columns as float32 arrays (a 30 year comparison is ~30 KB instead of the ~60 KB
+    DataFrame). Oldest runs are evicted past max_runs or once the arrays take more than
+    max_bytes. float32 keeps about 7 significant digits, cents are approximate above
+    ~$100K, which is plenty to re-display and chart a run.
+    """
+    def __init__(self, max_runs=20, max_bytes=2 * 2**20):
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+
+        self._runs = OrderedDict() # run id -> saved run, oldest first
+        self._ids = {}             # normalized inputs -> run id
+        self._run_count = 0
+        self.nbytes = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._runs)
+
+    def __contains__(self, run_id):
+        return run_id in self._runs
+
+    def find(self, inputs):
+        """
+        Id of the saved run with these inputs, or None
+        """
+        return self._ids.get(normalize_key('run', inputs))
+
+    def add(self, inputs, df, label=None):
+        """
+        Saves a comparison DataFrame and returns its run id. Saving inputs that are
+        already in the history refreshes that run instead of storing a copy.
+        """
+        key = normalize_key('run', inputs)
+        if key in self._ids:
+            run_id = self._ids[key]
+            self._runs.move_to_end(run_id)
+            return run_id
+
+        self._run_count += 1
+        run_id = self._run_count
+        columns = {name: df[name].to_numpy(dtype=np.float32) for name in df.columns if name != 'Date'}
+        self._runs[run_id] = {
+            'run': run_id,
+            'label': label or f"Run {run_id}",
+            'saved_at': time.strftime('%H:%M:%S'),
+            'inputs': dict(inputs),
+            'key': key,
+            'start': np.datetime64(df['Date'].iloc[0], 'M'),
+            'columns': columns,
+            'nbytes': sum(values.nbytes for values in columns.values()),
+        }
+        self._ids[key] = run_id
+        self.nbytes += self._runs[run_id]['nbytes']
+
+        # Always keep the run just added, even if it is over max_bytes on its own
+        while len(self._runs) > 1 and (len(self._runs) > self.max_runs or self.nbytes > self.max_bytes):
+            self._evict_oldest()
+        return run_id
+
+    def _evict_oldest(self):
+        _, run = self._runs.popitem(last=False)
+        del self._ids[run['key']]
+        self.nbytes -= run['nbytes']
+        self.evictions += 1
+
+    def runs(self):
+        """
+        (run id, label, saved at) of the saved runs, newest first
+        """
+        return [(run['run'], run['label'], run['saved_at']) for run in reversed(self._runs.values())]
+
+    def inputs(self, run_id):
+        return dict(self._runs[run_id]['inputs'])
+
+    def arrays(self, run_id, columns=None):
+        """
+        Dates and float32 columns of a saved run, without building a DataFrame
+        """
+        run = self._runs[run_id]
+        names = list(run['columns']) if columns is None else columns
+        n = len(run['columns'][names[0]])
+        # Month arithmetic in numpy, pd.date_range with freq='MS' takes milliseconds
+        dates = np.arange(run['start'], run['start'] + n).astype('datetime64[ns]')
+        return {'Date': dates,
+                **{name: run['columns'][name] for name in names}}
+
+    def frame(self, run_id, columns=None):
+        return pd.DataFrame(self.arrays(run_id, columns), copy=False)
+
+    def clear(self):
+        self._runs.clear()
+        self._ids.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {
+            'runs': len(self._runs),
+            'max_runs': self.max_runs,
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+        }
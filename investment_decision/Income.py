@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from compounding import step_growth
 
 
 
@@ -6,9 +8,18 @@ class Budget(object):
     def __init__(self, 
                  monthly_net_income, 
                  expected_annual_salary_increase_perc,
-                 years
+                 years,
+                 raise_frequency='annual',
+                 dtype=np.float64,
 
     ):
+        """
+        raise_frequency: how often income steps up by its share of
+        expected_annual_salary_increase_perc, one of compounding.FREQUENCIES
+        dtype: float type of the schedule's money columns, np.float32 halves memory
+        """
+        self.dtype = np.dtype(dtype)
+        self.raise_frequency = raise_frequency
         self.annu_salary_bump_rt = expected_annual_salary_increase_perc / 100
         self.monthly_net = monthly_net_income
         self.years = years
@@ -19,17 +30,20 @@ class Budget(object):
                                         periods=periods,
                                         freq='MS')
     def salary_bump(self, month_n):
-        years_elapsed = month_n // 12
-        salary = self.monthly_net * (1+self.annu_salary_bump_rt) ** years_elapsed
-        return round(salary, 2)
+        salary = self.monthly_net * step_growth(self.annu_salary_bump_rt, month_n, self.raise_frequency)
+        return round(float(salary), 2)
     
+    def schedule_arrays(self):
+        """
+        Schedule columns as numpy arrays, without building a DataFrame
+        """
+        growth = step_growth(self.annu_salary_bump_rt, np.arange(len(self.date_range)), self.raise_frequency)
+        salary = np.empty(len(self.date_range), dtype=self.dtype)
+        np.round(self.monthly_net * growth, 2, out=salary)
+        return {
+            'Date': self.date_range.values,
+            'Monthly Income': salary,
+        }
+
     def schedule(self):
-        data = []
-        for i, date in enumerate(self.date_range):
-            salary = self.salary_bump(i)
-            row = {
-                'Date': date,
-                'Monthly Income': salary,
-            }
-            data.append(row)
-        return pd.DataFrame(data)
+        return pd.DataFrame(self.schedule_arrays(), copy=False)
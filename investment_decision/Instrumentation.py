@@ -0,0 +1,126 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Sized
+from contextlib import contextmanager
+
+
+def jsonl_exporter(filepath):
+    """
+    Export hook appending every finished run to filepath as one JSON line
+    ex: Stage_Recorder(exporter=jsonl_exporter('stage_metrics.jsonl'))
+    """
+    def export(run):
+        with open(filepath, 'a') as f:
+            f.write(json.dumps(run, default=str) + '\n')
+    return export
+
+
+def _result_rows(result):
+    return len(result) if isinstance(result, Sized) else None
+
+
+def _result_bytes(result):
+    # Looked up on the type, some results (ex: streamlit elements) raise on unknown attributes
+    if getattr(type(result), 'memory_usage', None) is None:
+        return None
+    return int(result.memory_usage(index=False).sum())
+
+
+class Stage_Recorder(object):
+    """
+    Records the wall time, row count and memory of each stage of a run and keeps the
+    last max_runs runs. A run is one comparison, or whatever the caller wraps in run().
+
+    profile: capture a cProfile of each run, the top functions are kept as text
+    trace_memory: measure each stage's peak allocations with tracemalloc, this slows
+        the stages down noticeably so it is off by default
+    exporter: optional callable receiving every finished run as a dict, ex: jsonl_exporter
+    """
+    def __init__(self, profile=False, trace_memory=False, exporter=None, max_runs=20, profile_lines=25):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.exporter = exporter
+        self.profile_lines = profile_lines
+        self.runs = deque(maxlen=max_runs)
+        self._current = None
+        self._run_count = 0
+
+    @contextmanager
+    def run(self, label='comparison'):
+        """
+        Groups the stages measured inside it into one run. Nested runs join the outer one,
+        so the app can wrap a comparison and its chart in a single run.
+        """
+        if self._current is not None:
+            yield self._current
+            return
+
+        self._run_count += 1
+        run = {'run': self._run_count, 'label': label, 'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'total_seconds': None, 'stages': [], 'profile': None}
+        profiler = cProfile.Profile() if self.profile else None
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is already active
+                profiler = None
+
+        self._current = run
+        start = time.perf_counter()
+        try:
+            yield run
+        finally:
+            run['total_seconds'] = time.perf_counter() - start
+            self._current = None
+            if profiler is not None:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(self.profile_lines)
+                run['profile'] = out.getvalue()
+            if started_tracing:
+                tracemalloc.stop()
+            self.runs.append(run)
+            if self.exporter is not None:
+                self.exporter(run)
+
+    def measure(self, stage, compute):
+        """
+        Calls compute() inside the current run (or a run of its own) and records the stage
+        """
+        with self.run(stage) as run:
+            tracing = self.trace_memory and tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+
+            start = time.perf_counter()
+            ret = compute()
+            seconds = time.perf_counter() - start
+
+            run['stages'].append({
+                'stage': stage,
+                'seconds': seconds,
+                'rows': _result_rows(ret),
+                'result_bytes': _result_bytes(ret),
+                'peak_alloc_bytes': tracemalloc.get_traced_memory()[1] - before if tracing else None,
+            })
+        return ret
+
+    def stage_table(self):
+        """
+        One row per run and stage of the kept runs, newest run first
+        """
+        return [{'run': run['run'], 'label': run['label'], 'started_at': run['started_at'],
+                 'total_seconds': run['total_seconds'], **stage}
+                for run in reversed(self.runs) for stage in run['stages']]
+
+    def clear(self):
+        self.runs.clear()
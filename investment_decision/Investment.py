@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from compounding import effective_monthly_rate
 # import math
 
 class Investment_Compounder(object):
@@ -7,10 +9,17 @@ class Investment_Compounder(object):
                  initial_investment, 
                  years, 
                  annual_growth_rate_perc,
+                 compounding='monthly',
+                 dtype=np.float64,
+                 start_date=None,
     ):
         """
-        Assumes monthly compound rate
+        compounding: how often annual_growth_rate_perc compounds, one of
+        compounding.FREQUENCIES. The schedule stays monthly at the equivalent monthly rate.
+        dtype: float type of the schedule's money columns, np.float32 halves memory
+        start_date: first month of the schedule, the current month when None
         """
+        self.dtype = np.dtype(dtype)
                 
         self.amt = initial_investment
         
@@ -18,55 +27,75 @@ class Investment_Compounder(object):
         self.periods = years * 12
 
         self.annu_rt = annual_growth_rate_perc / 100
+        self.compounding = compounding
+        self.monthly_rt = effective_monthly_rate(self.annu_rt, compounding)
         
 
-        self.start_date = pd.Timestamp('today').replace(day=1).date()
+        if start_date is None:
+            start_date = pd.Timestamp('today').replace(day=1).date()
+        self.start_date = start_date
         self.date_range = pd.date_range(start=self.start_date,
                                         periods=self.periods+1,
                                         freq='MS')
 
-    def schedule(self, monthly_rents, total_monthly_payments):
+    def schedule_arrays(self, monthly_rents, total_monthly_payments):
         """
-        Returns a list of monthly compounding iteration
+        Schedule columns as numpy arrays, without building a DataFrame.
         Assumes contributions are at beginning of month and take into account the compounding
         for the time period.
-        """        
+        """
+        rents = np.asarray(monthly_rents, dtype=np.float64)
+        payments = np.asarray(total_monthly_payments, dtype=np.float64)
+        n = min(len(rents), len(payments))
+        extra_investable_by_not_buying = np.maximum(0, payments[:n] - rents[:n])
 
-        ret = []
-        for i, (rent, home) in enumerate(zip(monthly_rents, total_monthly_payments)):
-            if i == 0:
-                extra_investable_by_not_buying = max(0, home-rent)
-                initial_balance = self.amt + extra_investable_by_not_buying
-                total_before_interest = initial_balance
-                interest = round(total_before_interest * (self.annu_rt / 12), 2)
-                compounded = initial_balance + interest
-                #First Row
-                new_row = {
-                    'Date': self.date_range[i],
-                    'Investment Initial Balance': initial_balance,
-                    'Investment Additional by Not Buying': extra_investable_by_not_buying, 
-                    'Investment Interest Earned': interest,
-                    'Investment Balance at End of Month': compounded,
-                }
+        initial_balance = np.empty(n, dtype=self.dtype)
+        interest = np.empty(n, dtype=self.dtype)
+        compounded = np.empty(n, dtype=self.dtype)
 
-            else:
-                extra_investable_by_not_buying = max(0, home-rent)
-                initial_balance = compounded
-                total_before_interest = initial_balance + extra_investable_by_not_buying
-                interest = round(total_before_interest * (self.annu_rt / 12), 2)
-                compounded = total_before_interest + interest
-            
-                new_row = {
-                    'Date': self.date_range[i],
-                    'Investment Initial Balance': initial_balance,
-                    'Investment Additional by Not Buying': extra_investable_by_not_buying, 
-                    'Investment Interest Earned': interest,
-                    'Investment Balance at End of Month': compounded,
-                }
+        # Interest is rounded to cents every month, so the balance has to be carried
+        # month to month. Math is done on python floats and stored into the typed arrays.
+        monthly_rt = self.monthly_rt
+        balance = self.amt
+        for i, extra in enumerate(extra_investable_by_not_buying.tolist()):
+            total_before_interest = balance + extra
+            month_interest = round(total_before_interest * monthly_rt, 2)
+            #First row starts from the initial investment plus the first contribution
+            initial_balance[i] = total_before_interest if i == 0 else balance
+            interest[i] = month_interest
+            balance = total_before_interest + month_interest
+            compounded[i] = balance
 
-            ret.append(new_row)
-        
-        return pd.DataFrame(ret)
+        return {
+            'Date': self.date_range[:n].values,
+            'Investment Initial Balance': initial_balance,
+            'Investment Additional by Not Buying': extra_investable_by_not_buying.astype(self.dtype, copy=False),
+            'Investment Interest Earned': interest,
+            'Investment Balance at End of Month': compounded,
+        }
+
+    def final_balance(self, monthly_rents, total_monthly_payments):
+        """
+        Balance at the end of the last month without building the schedule. The monthly
+        recurrence E_i = (E_i-1 + c_i) * g sums to initial * g^n + sum c_i * g^(n-i), one
+        dot product with a power vector. Interest isn't rounded to cents every month, so it
+        can differ from the schedule by a few cents.
+        """
+        rents = np.asarray(monthly_rents, dtype=np.float64)
+        payments = np.asarray(total_monthly_payments, dtype=np.float64)
+        n = min(len(rents), len(payments))
+        contributions = np.maximum(0, payments[:n] - rents[:n])
+
+        growth = 1 + self.monthly_rt
+        return float(self.amt * growth ** n + contributions @ growth ** np.arange(n, 0, -1))
+
+    def schedule(self, monthly_rents, total_monthly_payments):
+        """
+        Returns a DataFrame of the monthly compounding iteration
+        Assumes contributions are at beginning of month and take into account the compounding
+        for the time period.
+        """        
+        return pd.DataFrame(self.schedule_arrays(monthly_rents, total_monthly_payments), copy=False)
 
 
 # a = Investment_Compounder(25_000,
@@ -1,34 +1,48 @@
+import numpy as np
 import pandas as pd
 import math
+from compounding import step_growth
 
 class Renting(object):
     def __init__(self, 
                  monthly_rent_cost, 
                  annual_rent_increase_perc,
-                 years
-
+                 years,
+                 increase_frequency='annual',
+                 start_date=None,
     ):
+        """
+        increase_frequency: how often rent steps up by its share of annual_rent_increase_perc,
+        one of compounding.FREQUENCIES
+        start_date: first month of the schedule, the current month when None
+        """
+        self.increase_frequency = increase_frequency
         self.annu_rent_rt = annual_rent_increase_perc / 100
         self.monthly_rent = monthly_rent_cost
         self.years = years
         periods = self.years*12
 
-        today = pd.Timestamp('today').replace(day=1).date()
-        self.date_range = pd.date_range(start=today,
+        if start_date is None:
+            start_date = pd.Timestamp('today').replace(day=1).date()
+        self.date_range = pd.date_range(start=start_date,
                                         periods=periods+1,
                                         freq='MS')
     def rent_value(self, month_n):
-        years_elapsed = month_n // 12
-        rent = self.monthly_rent * (1+self.annu_rent_rt) ** years_elapsed
+        rent = self.monthly_rent * step_growth(self.annu_rent_rt, month_n, self.increase_frequency)
         return math.ceil(rent)
     
+    def schedule_arrays(self):
+        """
+        Schedule columns as numpy arrays, without building a DataFrame.
+        Rent is rounded up to whole dollars and kept as int64.
+        """
+        growth = step_growth(self.annu_rent_rt, np.arange(len(self.date_range)), self.increase_frequency)
+        rent = np.empty(len(self.date_range), dtype=np.int64)
+        np.ceil(self.monthly_rent * growth, out=rent, casting='unsafe')
+        return {
+            'Date': self.date_range.values,
+            'Rent Cost': rent,
+        }
+
     def schedule(self):
-        data = []
-        for i, date in enumerate(self.date_range):
-            rent = self.rent_value(i)
-            row = {
-                'Date': date,
-                'Rent Cost': rent,
-            }
-            data.append(row)
-        return pd.DataFrame(data)
\ No newline at end of file
+        return pd.DataFrame(self.schedule_arrays(), copy=False)
\ No newline at end of file
@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+from Amortizer import equal_monthly_payment
+
+# Same inputs, same order, as Compare_Investments.__init__
+SCENARIO_INPUTS = (
+    'home_price',
+    'home_down_payment',
+    'home_loan_interest_perc',
+    'pmi_monthly_amt',
+    'home_loan_years',
+    'initial_additional_home_expenses',
+    'annual_home_appreciation_perc',
+    'other_fixed_monthly_payments',
+    'annual_investment_growth_perc',
+    'monthly_rent_amt',
+    'annual_rent_appreciation_perc',
+)
+
+SCHEDULE_COLUMNS = (
+    'Rent Cost',
+    'Home Outstanding Balance',
+    'Home Total Monthly Payments',
+    'Home Expected Value',
+    'Home Expected Equity',
+    'Investment Additional by Not Buying',
+    'Investment Balance at End of Month',
+)
+
+
+def evaluate_scenarios(inputs, loan_periods, keep_schedules=False,
+                       investment_growth=None, home_growth=None):
+    """
+    Runs the rent, amortization and investment engines for many scenarios at once
+    as 2-D (scenario x month) arrays.
+
+    inputs: dict of SCENARIO_INPUTS -> 1-D arrays of equal length. Every scenario must
+        share the same loan length, `loan_periods` months.
+    investment_growth, home_growth: optional (scenario x loan_periods+1) arrays of monthly
+        growth factors (1 + monthly rate) replacing the fixed annual rates. Column 0 of
+        home_growth is ignored since month 0 is the purchase price.
+
+    Returns a dict with the final month values and, when keep_schedules is True,
+    every SCHEDULE_COLUMNS 2-D array.
+    """
+    col = lambda name: np.asarray(inputs[name], dtype=float)[:, None]
+    months = np.arange(loan_periods + 1)
+
+    home_price = col('home_price')
+    loan_amount = home_price - col('home_down_payment')
+    monthly_rt = col('home_loan_interest_perc') / 100 / 12
+    EMI = equal_monthly_payment(loan_amount, monthly_rt, loan_periods)
+
+    # Closed form balance (L - EMI/r) * (1+r)^k + EMI/r, zero rate loans are linear
+    interest_free = monthly_rt[:, 0] == 0.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payoff = np.where(monthly_rt == 0., 0., EMI / monthly_rt)
+    balance = (1+monthly_rt) ** months
+    balance *= loan_amount - payoff
+    balance += payoff
+    if interest_free.any():
+        balance[interest_free] = loan_amount[interest_free] - EMI[interest_free] * months
+    np.maximum(balance, 0, out=balance)
+    if keep_schedules:
+        balance = np.round(balance, 2)
+
+    # Month 0 is the purchase month, no payments are made
+    home_total = (balance > home_price * 0.80) * col('pmi_monthly_amt')
+    home_total += EMI + col('other_fixed_monthly_payments')
+    home_total[:, 0] = 0.
+
+    # Rent only steps once a year, so the power is taken per year and spread over months
+    rent_years = np.arange(loan_periods // 12 + 1)
+    yearly_rent = np.ceil(col('monthly_rent_amt') * (1+col('annual_rent_appreciation_perc') / 100) ** rent_years)
+    rent = yearly_rent[:, months // 12]
+
+    contributions = np.subtract(home_total, rent)
+    np.maximum(contributions, 0, out=contributions)
+    initial_investment = col('home_down_payment') + col('initial_additional_home_expenses')
+
+    if home_growth is not None:
+        # Column 0 is replaced by 1 in the output, home_growth can be a read only view
+        home_growth = np.asarray(home_growth, dtype=float)
+        cumulative_home_growth = np.empty(home_growth.shape)
+        cumulative_home_growth[:, 0] = 1.
+        np.cumprod(home_growth[:, 1:], axis=1, out=cumulative_home_growth[:, 1:])
+    elif keep_schedules:
+        cumulative_home_growth = (1 + col('annual_home_appreciation_perc') / 100 / 12) ** months
+    else:
+        cumulative_home_growth = (1 + col('annual_home_appreciation_perc') / 100 / 12) ** months[-1:]
+    home_value = home_price * cumulative_home_growth
+
+    # Investment recurrence E_k = (E_k-1 + c_k) * g_k with E_-1 = initial investment,
+    # solved as E_k = G_k * (initial + sum_j<=k c_j / G_j-1) with G the cumulative growth.
+    if investment_growth is None and not keep_schedules:
+        monthly_growth = 1 + col('annual_investment_growth_perc') / 100 / 12
+        final_investment = (initial_investment[:, 0] * monthly_growth[:, 0] ** (loan_periods+1)
+                            + np.einsum('ij,ij->i', contributions, monthly_growth ** (loan_periods+1 - months)))
+        investment = final_investment[:, None]
+    else:
+        if investment_growth is None:
+            monthly_growth = 1 + col('annual_investment_growth_perc') / 100 / 12
+            cumulative_growth = monthly_growth ** (months + 1)
+            prior_growth = cumulative_growth / monthly_growth
+        else:
+            cumulative_growth = np.cumprod(investment_growth, axis=1)
+            prior_growth = cumulative_growth / investment_growth
+        investment = cumulative_growth * (initial_investment + np.cumsum(contributions / prior_growth, axis=1))
+
+    equity = home_value - balance[:, -home_value.shape[1]:]
+
+    ret = {
+        'Final Home Equity': equity[:, -1],
+        'Final Investment Balance': investment[:, -1],
+    }
+    if keep_schedules:
+        ret.update({
+            'Rent Cost': rent,
+            'Home Outstanding Balance': balance,
+            'Home Total Monthly Payments': home_total,
+            'Home Expected Value': home_value,
+            'Home Expected Equity': equity,
+            'Investment Additional by Not Buying': contributions,
+            'Investment Balance at End of Month': investment,
+        })
+    return ret
+
+
+def first_month_ahead(values, other):
+    """
+    First month (column) where values is above other, per scenario (row). -1 if never.
+    """
+    ahead = values > other
+    return np.where(ahead.any(axis=1), ahead.argmax(axis=1), -1)
+
+
+class Compare_Scenarios(object):
+    """
+    Batched version of Compare_Investments. Every constructor input accepts a scalar
+    or an array, arrays are broadcast against each other and each element is one
+    scenario. Use `from_grid` for the Cartesian product of input values.
+    """
+    def __init__(self,
+                 home_price,
+                 home_down_payment,
+                 home_loan_interest_perc,
+                 pmi_monthly_amt,
+                 home_loan_years,
+                 initial_additional_home_expenses,
+                 annual_home_appreciation_perc,
+                 other_fixed_monthly_payments,
+                 annual_investment_growth_perc,
+                 monthly_rent_amt,
+                 annual_rent_appreciation_perc,
+                 chunk_size=1_024,
+    ):
+        values = locals()
+        arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(values[name], dtype=float)) for name in SCENARIO_INPUTS))
+        self.inputs = {name: np.ravel(arr) for name, arr in zip(SCENARIO_INPUTS, arrays)}
+        self.inputs['home_loan_years'] = self.inputs['home_loan_years'].astype(int)
+        self.n_scenarios = len(self.inputs['home_price'])
+
+        # Bounds the (scenario x month) arrays to chunk_size rows at a time
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_grid(cls, chunk_size=1_024, **inputs):
+        """
+        Builds the Cartesian product of the given input values. Every SCENARIO_INPUTS
+        name is required, scalars are held fixed.
+        """
+        missing = set(SCENARIO_INPUTS) - set(inputs)
+        if missing:
+            raise TypeError(f"from_grid() missing inputs: {sorted(missing)}")
+
+        axes = [np.atleast_1d(np.asarray(inputs[name], dtype=float)) for name in SCENARIO_INPUTS]
+        grid = np.meshgrid(*axes, indexing='ij')
+        return cls(**{name: arr.ravel() for name, arr in zip(SCENARIO_INPUTS, grid)},
+                   chunk_size=chunk_size)
+
+    def _chunks(self):
+        """
+        Yields (scenario indices, loan periods) with every chunk sharing one loan length.
+        """
+        loan_years = self.inputs['home_loan_years']
+        for years in np.unique(loan_years):
+            idx = np.flatnonzero(loan_years == years)
+            for start in range(0, len(idx), self.chunk_size):
+                yield idx[start:start+self.chunk_size], int(years) * 12
+
+    def create_comparison(self, break_even_month=False):
+        """
+        Returns one row per scenario: its inputs, the final home equity, the final
+        investment balance and their delta (home minus investment).
+        break_even_month: also add the first month the home equity is ahead of the
+        investment balance (<NA> when it never is). Needs the full monthly schedules,
+        so it is slower.
+        """
+        equity = np.empty(self.n_scenarios)
+        investment = np.empty(self.n_scenarios)
+        months = np.full(self.n_scenarios, -1)
+        for idx, loan_periods in self._chunks():
+            res = evaluate_scenarios({name: arr[idx] for name, arr in self.inputs.items()}, loan_periods,
+                                     keep_schedules=break_even_month)
+            equity[idx] = res['Final Home Equity']
+            investment[idx] = res['Final Investment Balance']
+            if break_even_month:
+                months[idx] = first_month_ahead(res['Home Expected Equity'], res['Investment Balance at End of Month'])
+
+        df = pd.DataFrame(self.inputs)
+        df['Final Home Equity'] = equity
+        df['Final Investment Balance'] = investment
+        df['Delta'] = equity - investment
+        if break_even_month:
+            df['Break-Even Month'] = pd.array(np.where(months < 0, None, months), dtype='Int64')
+        return df
+
+    def create_schedules(self):
+        """
+        Full monthly schedules grouped by loan length.
+        Returns {loan years: {'Scenario': indices, 'Date': dates, column: 2-D array}}
+        """
+        start_date = pd.Timestamp('today').replace(day=1).date()
+        ret = {}
+        for idx, loan_periods in self._chunks():
+            res = evaluate_scenarios({name: arr[idx] for name, arr in self.inputs.items()}, loan_periods,
+                                     keep_schedules=True)
+            group = ret.setdefault(loan_periods // 12, {'Scenario': [], **{c: [] for c in SCHEDULE_COLUMNS}})
+            group['Scenario'].append(idx)
+            for c in SCHEDULE_COLUMNS:
+                group[c].append(res[c])
+
+        for loan_years, group in ret.items():
+            group['Scenario'] = np.concatenate(group['Scenario'])
+            for c in SCHEDULE_COLUMNS:
+                group[c] = np.concatenate(group[c])
+            group['Date'] = pd.date_range(start=start_date, periods=loan_years*12+1, freq='MS')
+        return ret
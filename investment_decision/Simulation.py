@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from Scenarios import SCENARIO_INPUTS, evaluate_scenarios
+
+SIMULATED_COLUMNS = ('Home Expected Equity', 'Investment Balance at End of Month')
+PERCENTILES = (10, 50, 90)
+MAX_MONTHLY_LOSS = 0.99
+
+# Histograms are binned on arcsinh(value / HISTOGRAM_SCALE), which is linear around zero
+# and logarithmic for large balances, so skewed outcomes keep relative precision.
+HISTOGRAM_SCALE = 1_000.
+
+
+class Return_Distribution(object):
+    def __init__(self,
+                 annual_mean_perc,
+                 annual_volatility_perc,
+                 kind='normal',
+                 degrees_of_freedom=5,
+    ):
+        """
+        Monthly return distribution built from annual figures.
+        kind: 'normal' (arithmetic monthly returns), 'lognormal' (log returns, same
+        expected monthly growth) or 't' (fat tailed, scaled to the same volatility)
+        """
+        if kind not in ('normal', 'lognormal', 't'):
+            raise ValueError(f"Unknown distribution kind: {kind}")
+        if kind == 't' and degrees_of_freedom <= 2:
+            raise ValueError("degrees_of_freedom must be above 2 for a finite volatility")
+
+        self.kind = kind
+        self.degrees_of_freedom = degrees_of_freedom
+        self.monthly_mean = annual_mean_perc / 100 / 12
+        self.monthly_volatility = annual_volatility_perc / 100 / np.sqrt(12)
+
+    def sample(self, rng, size):
+        """
+        Returns monthly growth factors (1 + monthly return). A month can lose at most
+        MAX_MONTHLY_LOSS, which keeps the cumulative growth invertible.
+        """
+        if self.kind == 'lognormal':
+            log_mean = np.log1p(self.monthly_mean) - self.monthly_volatility ** 2 / 2
+            return rng.lognormal(log_mean, self.monthly_volatility, size)
+
+        if self.kind == 't':
+            dof = self.degrees_of_freedom
+            shocks = rng.standard_t(dof, size) * np.sqrt((dof - 2) / dof)
+        else:
+            shocks = rng.standard_normal(size)
+        return np.maximum(1 - MAX_MONTHLY_LOSS, 1 + self.monthly_mean + self.monthly_volatility * shocks)
+
+
+def _simulate_paths(inputs, loan_periods, investment_distribution, appreciation_distribution, seed, n_paths):
+    rng = np.random.default_rng(seed)
+    shape = (n_paths, loan_periods + 1)
+    res = evaluate_scenarios({name: np.full(n_paths, value) for name, value in inputs.items()}, loan_periods,
+                             keep_schedules=True,
+                             investment_growth=investment_distribution.sample(rng, shape),
+                             home_growth=None if appreciation_distribution is None else appreciation_distribution.sample(rng, shape))
+    return res
+
+
+def _histogram(values, lower, width, n_bins):
+    """
+    Per-month histogram of a (path x month) array, out of range values land in the end bins
+    """
+    bins = np.clip(((np.arcsinh(values / HISTOGRAM_SCALE) - lower) / width).astype(np.int64), 0, n_bins - 1)
+    bins += np.arange(values.shape[1]) * n_bins
+    return np.bincount(bins.ravel(), minlength=values.shape[1] * n_bins).reshape(values.shape[1], n_bins)
+
+
+def _simulate_chunk(inputs, loan_periods, investment_distribution, appreciation_distribution,
+                    seed, n_paths, edges, n_bins):
+    """
+    Simulates one chunk of paths and reduces it to histograms, so a worker only ever
+    returns (month x bin) counts instead of the paths themselves.
+    """
+    res = _simulate_paths(inputs, loan_periods, investment_distribution, appreciation_distribution, seed, n_paths)
+    counts = {c: _histogram(res[c], *edges[c], n_bins) for c in SIMULATED_COLUMNS}
+    home_wins = int(np.count_nonzero(res['Final Home Equity'] > res['Final Investment Balance']))
+    return counts, home_wins
+
+
+def _quantiles(counts, lower, width, percentiles):
+    """
+    Interpolated percentiles from (month x bin) histogram counts
+    """
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1:]
+    ret = []
+    for p in percentiles:
+        target = total * p / 100
+        bin_idx = np.minimum((cumulative < target).sum(axis=1, keepdims=True), counts.shape[1] - 1)
+        below = np.take_along_axis(cumulative, bin_idx, axis=1) - np.take_along_axis(counts, bin_idx, axis=1)
+        in_bin = np.maximum(np.take_along_axis(counts, bin_idx, axis=1), 1)
+        fraction = np.clip((target - below) / in_bin, 0, 1)
+        ret.append(HISTOGRAM_SCALE * np.sinh(lower + (bin_idx + fraction)[:, 0] * width))
+    return ret
+
+
+class Monte_Carlo_Simulation(object):
+    """
+    Stochastic version of Compare_Investments. Monthly investment returns and, optionally,
+    monthly home appreciation are drawn from Return_Distribution objects over n_paths
+    paths. Paths are simulated chunk_size at a time and folded into per-month histograms,
+    so memory does not grow with n_paths.
+    """
+    def __init__(self,
+                 home_price,
+                 home_down_payment,
+                 home_loan_interest_perc,
+                 pmi_monthly_amt,
+                 home_loan_years,
+                 initial_additional_home_expenses,
+                 annual_home_appreciation_perc,
+                 other_fixed_monthly_payments,
+                 annual_investment_growth_perc,
+                 monthly_rent_amt,
+                 annual_rent_appreciation_perc,
+                 investment_volatility_perc=15.,
+                 appreciation_volatility_perc=5.,
+                 distribution='normal',
+                 n_paths=10_000,
+                 chunk_size=1_000,
+                 n_workers=None,
+                 seed=None,
+                 n_bins=1_024,
+    ):
+        values = locals()
+        self.inputs = {name: float(values[name]) for name in SCENARIO_INPUTS}
+        self.loan_periods = int(home_loan_years) * 12
+
+        self.investment_distribution = Return_Distribution(annual_investment_growth_perc,
+                                                           investment_volatility_perc,
+                                                           kind=distribution)
+        if appreciation_volatility_perc:
+            self.appreciation_distribution = Return_Distribution(annual_home_appreciation_perc,
+                                                                 appreciation_volatility_perc,
+                                                                 kind=distribution)
+        else:
+            self.appreciation_distribution = None
+
+        self.n_paths = n_paths
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers
+        self.seed = seed
+        self.n_bins = n_bins
+
+        self.bands_df = pd.DataFrame({})
+        self.probability_home_wins = None
+
+    def simulate(self):
+        """
+        Returns a DataFrame with the P10/P50/P90 of home equity and investment balance
+        per month. The probability that buying beats investing at the end of the loan is
+        stored in `probability_home_wins`.
+        """
+        chunk_sizes = [min(self.chunk_size, self.n_paths - start) for start in range(0, self.n_paths, self.chunk_size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(chunk_sizes))
+        model = (self.inputs, self.loan_periods, self.investment_distribution, self.appreciation_distribution)
+
+        # The first chunk fixes the histogram range of every month, padded so later
+        # chunks rarely fall outside of it.
+        pilot = _simulate_paths(*model, seeds[0], chunk_sizes[0])
+        edges = {}
+        for c in SIMULATED_COLUMNS:
+            scaled = np.arcsinh(pilot[c] / HISTOGRAM_SCALE)
+            low, high = scaled.min(axis=0), scaled.max(axis=0)
+            pad = np.maximum(high - low, 1e-3)
+            edges[c] = (low - pad, 3 * pad / self.n_bins)
+
+        counts = {c: _histogram(pilot[c], *edges[c], self.n_bins) for c in SIMULATED_COLUMNS}
+        home_wins = int(np.count_nonzero(pilot['Final Home Equity'] > pilot['Final Investment Balance']))
+        del pilot
+
+        tasks = [(*model, seed, n, edges, self.n_bins) for seed, n in zip(seeds[1:], chunk_sizes[1:])]
+        if self.n_workers and self.n_workers > 1 and tasks:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+                results = pool.map(_simulate_chunk, *zip(*tasks))
+                for chunk_counts, chunk_wins in results:
+                    for c in SIMULATED_COLUMNS:
+                        counts[c] += chunk_counts[c]
+                    home_wins += chunk_wins
+        else:
+            for task in tasks:
+                chunk_counts, chunk_wins = _simulate_chunk(*task)
+                for c in SIMULATED_COLUMNS:
+                    counts[c] += chunk_counts[c]
+                home_wins += chunk_wins
+
+        start_date = pd.Timestamp('today').replace(day=1).date()
+        df = pd.DataFrame({'Date': pd.date_range(start=start_date, periods=self.loan_periods+1, freq='MS')})
+        for c in SIMULATED_COLUMNS:
+            for p, values in zip(PERCENTILES, _quantiles(counts[c], *edges[c], PERCENTILES)):
+                df[f'{c} P{p}'] = values
+
+        self.bands_df = df
+        self.probability_home_wins = home_wins / self.n_paths
+        return self.bands_df
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from Scenarios import SCENARIO_INPUTS, evaluate_scenarios
+
+# Default search ranges for the inputs that can be solved for. Money inputs without
+# an entry search between 0 and 10x their current value.
+SEARCH_RANGES = {
+    'home_loan_interest_perc': (0., 40.),
+    'annual_home_appreciation_perc': (-20., 40.),
+    'annual_investment_growth_perc': (-20., 40.),
+    'annual_rent_appreciation_perc': (-20., 40.),
+}
+
+# Loan years is discrete and sets the schedule length, so it can't be solved for
+SOLVABLE_INPUTS = tuple(name for name in SCENARIO_INPUTS if name != 'home_loan_years')
+
+
+def final_delta(inputs, loan_periods):
+    """
+    Final home equity minus final investment balance per scenario, without building
+    any DataFrame. inputs follows Scenarios.evaluate_scenarios.
+    """
+    res = evaluate_scenarios(inputs, loan_periods)
+    return res['Final Home Equity'] - res['Final Investment Balance']
+
+
+def bracket_roots(func, lower, upper, n_points=33, tol=1e-6, max_iter=20):
+    """
+    Finds a root of func in [lower, upper] for many independent problems at once.
+    Each iteration evaluates n_points candidates per problem in one vectorized call,
+    keeps the first sub-interval where the sign changes and repeats until it is
+    narrower than tol, then interpolates linearly inside it.
+
+    func: maps a (problem x candidate) array to a same shaped array of values
+    lower, upper: 1-D arrays, one bracket per problem
+    Returns a 1-D array of roots, NaN where the bracket has no sign change.
+    """
+    lower = np.array(lower, dtype=float, ndmin=1)
+    upper = np.array(upper, dtype=float, ndmin=1)
+    steps = np.linspace(0, 1, n_points)
+    found = np.ones(len(lower), dtype=bool)
+
+    for _ in range(max_iter):
+        candidates = lower[:, None] + (upper - lower)[:, None] * steps
+        values = func(candidates)
+
+        exact = values == 0
+        crossing = exact[:, :-1] | (np.sign(values[:, :-1]) * np.sign(values[:, 1:]) < 0)
+        found &= crossing.any(axis=1)
+        idx = np.where(found, crossing.argmax(axis=1), 0)
+
+        rows = np.arange(len(lower))
+        lower, upper = candidates[rows, idx], candidates[rows, idx+1]
+        low_value, high_value = values[rows, idx], values[rows, idx+1]
+        if np.all(upper - lower < tol):
+            break
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(low_value == high_value, 0., low_value / (low_value - high_value))
+    return np.where(found, lower + np.clip(weight, 0, 1) * (upper - lower), np.nan)
+
+
+class Break_Even_Solver(object):
+    """
+    Finds the value of one input that makes buying and investing end up equal,
+    holding every other input of a Compare_Investments fixed.
+    """
+    def __init__(self, inputs):
+        """
+        inputs: Compare_Investments.inputs, or a dict with every SCENARIO_INPUTS name
+        """
+        self.inputs = {name: float(inputs[name]) for name in SCENARIO_INPUTS}
+        self.loan_periods = int(inputs['home_loan_years']) * 12
+
+    def search_range(self, input_name):
+        if input_name in SEARCH_RANGES:
+            return SEARCH_RANGES[input_name]
+        if input_name == 'home_down_payment':
+            return (0., self.inputs['home_price'])
+        return (0., 10 * max(self.inputs[input_name], 1_000.))
+
+    def _delta(self, input_name, candidates, fixed=None):
+        """
+        Final delta for a (problem x candidate) array of input_name values.
+        fixed: optional {input name: 1-D array} varying per problem (row)
+        """
+        n = candidates.size
+        inputs = {name: np.full(n, value) for name, value in self.inputs.items()}
+        for name, values in (fixed or {}).items():
+            inputs[name] = np.repeat(values, candidates.shape[1])
+        inputs[input_name] = candidates.ravel()
+        return final_delta(inputs, self.loan_periods).reshape(candidates.shape)
+
+    def _check(self, input_name):
+        if input_name not in SOLVABLE_INPUTS:
+            raise ValueError(f"Can't solve for {input_name}, choose one of {SOLVABLE_INPUTS}")
+
+    def solve(self, input_name, lower=None, upper=None, tol=1e-6):
+        """
+        Returns the break-even value of input_name, or NaN when the two options don't
+        tie anywhere in [lower, upper] (defaults from search_range).
+        """
+        self._check(input_name)
+        default_lower, default_upper = self.search_range(input_name)
+        lower = default_lower if lower is None else lower
+        upper = default_upper if upper is None else upper
+
+        root = bracket_roots(lambda c: self._delta(input_name, c), [lower], [upper], tol=tol)
+        return float(root[0])
+
+    def solve_curve(self, input_name, x_name, x_values, lower=None, upper=None, tol=1e-6):
+        """
+        Break-even value of input_name for each value of a second input x_name,
+        solved for every x value in the same vectorized calls.
+        ex: solve_curve('annual_home_appreciation_perc', 'annual_investment_growth_perc', np.arange(4, 12))
+        """
+        self._check(input_name)
+        self._check(x_name)
+        if x_name == input_name:
+            raise ValueError("x_name must differ from input_name")
+
+        x_values = np.asarray(x_values, dtype=float)
+        default_lower, default_upper = self.search_range(input_name)
+        lower = np.full(len(x_values), default_lower if lower is None else lower)
+        upper = np.full(len(x_values), default_upper if upper is None else upper)
+
+        roots = bracket_roots(lambda c: self._delta(input_name, c, fixed={x_name: x_values}), lower, upper, tol=tol)
+        return pd.DataFrame({x_name: x_values, input_name: roots})
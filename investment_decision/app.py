@@ -1,9 +1,12 @@
 import streamlit as st
-import plotly.graph_objects as go
-from main import Compare_Investments 
+from Cache import LRU_Cache
 from functions import fmt_money
 import math
 
+# The engines (and the pandas/numpy/plotly they pull in) are imported where they are
+# first used, so the page and inputs render before any of them load. See
+# benchmarks/startup_report.py for the cold start budget.
+
 
 st.set_page_config(
     page_title="Investment Simulation App",
@@ -11,6 +14,102 @@ st.set_page_config(
     initial_sidebar_state="auto",
 )
 
+@st.cache_resource
+def get_schedule_cache():
+    """
+    One schedule cache shared by every session of this server process
+    """
+    return LRU_Cache(max_size=512, ttl_seconds=60*60)
+
+schedule_cache = get_schedule_cache()
+
+
+def comparison_figure(df):
+    """
+    Home equity vs investment balance over time
+    """
+    import plotly.graph_objects as go
+    from charts import line_trace, points_per_trace
+
+    fig = go.Figure()
+    max_points = points_per_trace(2)
+
+    # Add Home Equity line
+    fig.add_trace(line_trace(df["Date"], df["Home Expected Equity"], max_points=max_points,
+        mode="lines",
+        name="Home Equity Value",
+        line=dict(width=5, color='#1f77b4')
+    ))
+
+    # Add Investment line
+    fig.add_trace(line_trace(df["Date"], df["Investment Balance at End of Month"], max_points=max_points,
+        mode="lines",
+        name="Investment Value",
+        line=dict(width=5, dash='dot', color='#ff7f0e')  # dashed line for visual separation
+    ))
+
+    # Customize layout
+    fig.update_layout(
+        title="Equity in Home vs Investment Portfolio Over Time",
+        xaxis_title="Date",
+        yaxis_title="Value",
+        yaxis_tickformat="$.2s",  # formats large numbers like 1.5M, 750K
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(t=40, b=20, l=40, r=20),
+        height=500
+    )
+    return fig
+
+
+def history_figure(run_history, run_ids, labels):
+    """
+    Home equity and investment balance curves of several saved runs, one color per run
+    """
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+    from charts import line_trace, points_per_trace
+
+    fig = go.Figure()
+    max_points = points_per_trace(2 * len(run_ids))
+    for i, run_id in enumerate(run_ids):
+        color = qualitative.Plotly[i % len(qualitative.Plotly)]
+        saved = run_history.arrays(run_id, columns=["Home Expected Equity", "Investment Balance at End of Month"])
+        fig.add_trace(line_trace(saved["Date"], saved["Home Expected Equity"], max_points=max_points,
+                                 mode="lines", name=f"{labels[run_id]}: Home", legendgroup=str(run_id),
+                                 line=dict(width=3, color=color)))
+        fig.add_trace(line_trace(saved["Date"], saved["Investment Balance at End of Month"], max_points=max_points,
+                                 mode="lines", name=f"{labels[run_id]}: Investment", legendgroup=str(run_id),
+                                 line=dict(width=3, dash='dot', color=color)))
+
+    fig.update_layout(
+        title="Saved Runs: Home Equity (solid) vs Investment (dotted)",
+        xaxis_title="Date",
+        yaxis_title="Value",
+        yaxis_tickformat="$.2s",
+        legend=dict(orientation="h", yanchor="top", y=-0.15, xanchor="left", x=0),
+        margin=dict(t=40, b=20, l=40, r=20),
+        height=550
+    )
+    return fig
+
+
+def run_label(inputs):
+    return (f"{fmt_money(inputs['home_price'])} home, {fmt_money(inputs['home_down_payment'])} down, "
+            f"{inputs['home_loan_interest_perc']:g}% loan, {fmt_money(inputs['monthly_rent_amt'])} rent, "
+            f"{inputs['annual_investment_growth_perc']:g}% invested")
+
+
+# Hidden diagnostics, open the app with ?diagnostics=1 to time every stage of a run
+diagnostics_enabled = st.query_params.get('diagnostics') in ('1', 'true')
+stage_recorder = None
+if diagnostics_enabled:
+    from Instrumentation import Stage_Recorder
+
+    if 'stage_recorder' not in st.session_state:
+        st.session_state['stage_recorder'] = Stage_Recorder(max_runs=20)
+    stage_recorder = st.session_state['stage_recorder']
+
+
 st.markdown(
     "<h1 style='text-align: center;'>Buying Home vs Investing Simulation <br> 🏠vs📈</h1>",
     unsafe_allow_html=True
@@ -47,6 +146,7 @@ with tabs[1]:
         <p>The optional home settings is where the analysis really shines, so make sure to make use of this section, though it is optional.</p>
         <p>Rent value is compounding anually (this assumes you sign a 12-month lease each year, with annual increases)</p>
         <p>Investment rate compounding is compounded monthly, just like the home appreciation</p>
+        <p>The optional Monte Carlo settings replace the fixed investment and appreciation rates with random monthly draws around them, and show the range of outcomes (10th, 50th and 90th percentiles) along with how often buying the home comes out ahead</p>
         <p>Any time where total monthly home values exceeds the rent value, that amount is added into the monthly recurring investments</p>
         <p>The home downpayment and any additional up-front costs is also assumed to be added as the initial balance to the investment</p>
 
@@ -66,7 +166,18 @@ with tabs[1]:
     )
 
 
-with tabs[0]:
+@st.fragment
+def calculator_tab():
+    """
+    The inputs and every result. A fragment, so editing an input reruns only this tab
+    instead of the whole page (title, Info tab and diagnostics setup).
+    """
+    # The Diagnostics toggles are in this fragment and only rerun it, so their settings
+    # are applied here rather than with the recorder at the top of the page
+    if stage_recorder is not None:
+        stage_recorder.profile = st.session_state.get('diagnostics_profile', False)
+        stage_recorder.trace_memory = st.session_state.get('diagnostics_trace_memory', False)
+
     main_column1, main_column2 = st.columns(spec=2, gap='large', vertical_alignment='top', border=True)
 
     with main_column1: #Home options
@@ -146,78 +257,432 @@ with tabs[0]:
                         help="Expected annual investment compounding rate (like the S&P500, for example). This value is compounded monthly")
 
 
-    run_simulation = st.button("🚀 Run Comparison!", use_container_width=True, type='primary')
-    st.divider()
+    with st.expander(label='Monte Carlo Settings (Optional)'):
+        run_monte_carlo = st.toggle(label='Simulate market uncertainty', key='run_monte_carlo', value=False,
+                        help="Instead of one fixed rate, draws a random investment return and home appreciation "
+                        "every month over thousands of paths, using the rates above as the average.")
 
+        mc_column1, mc_column2 = st.columns(spec=2, gap='large')
+        investment_volatility = mc_column1.number_input(label="Annual Investment Volatility", key='investment_volatility_perc',
+                        min_value=0.00, max_value=None,
+                        value=15.0, step=0.5,
+                        help="Standard deviation of annual investment returns. Broad stock indexes have historically been around 15%.")
+
+        appreciation_volatility = mc_column2.number_input(label="Annual Home Appreciation Volatility", key='appreciation_volatility_perc',
+                        min_value=0.00, max_value=None,
+                        value=5.0, step=0.5,
+                        help="Standard deviation of annual home appreciation. Set to 0 to keep home appreciation fixed.")
+
+        return_distribution = mc_column1.selectbox(label="Return Distribution", key='return_distribution',
+                        options=['normal', 'lognormal', 't'], index=0,
+                        help="Shape of the monthly draws. 't' has fatter tails, meaning more extreme months.")
+
+        n_paths = mc_column2.select_slider(label="Simulated Paths", key='n_paths',
+                        options=[1_000, 2_500, 5_000, 10_000], value=5_000,
+                        help="More paths give smoother bands but take longer to run.")
+
+
+    inputs = dict(home_price=home_price,
+                  home_down_payment=home_down_payment,
+                  home_loan_interest_perc=home_loan_interest_perc,
+                  pmi_monthly_amt=pmi_amount,
+                  home_loan_years=home_loan_years,
+                  initial_additional_home_expenses=other_upfront_home_fees,
+                  annual_home_appreciation_perc=home_value_compound,
+                  other_fixed_monthly_payments=other_monthly_home_fees,
+                  annual_investment_growth_perc=investment_compound,
+                  monthly_rent_amt=monthly_rent,
+                  annual_rent_appreciation_perc=rent_compound)
+
+
+    button_column, live_column = st.columns(spec=[4, 1], vertical_alignment='center')
+    run_simulation = button_column.button("🚀 Run Comparison!", use_container_width=True, type='primary')
+    live_mode = live_column.toggle(label="⚡ Live", key='live_mode', value=False,
+                    help="Update the results as soon as an input changes, without pressing the button. "
+                    "The Monte Carlo simulation still runs on the button.")
+    st.divider()
 
-    if run_simulation:
-        #Load data
-        compare = Compare_Investments(home_price=home_price,
-                                    home_down_payment=home_down_payment,
-                                    home_loan_interest_perc=home_loan_interest_perc,
-                                    pmi_monthly_amt=pmi_amount,
-                                    home_loan_years=home_loan_years,
-                                    initial_additional_home_expenses=other_upfront_home_fees,
-                                    annual_home_appreciation_perc=home_value_compound,
-                                    other_fixed_monthly_payments=other_monthly_home_fees,
-                                    annual_investment_growth_perc=investment_compound,
-                                    monthly_rent_amt=monthly_rent,
-                                    annual_rent_appreciation_perc=rent_compound)
-        df = compare.create_comparison()
-
-
-        # First show results KPI.
-        final_row = df.iloc[-1]
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Final home equity", fmt_money(final_row["Home Expected Equity"]))
-        col2.metric("Final investment balance", fmt_money(final_row["Investment Balance at End of Month"]))
-
-        delta = final_row["Home Expected Equity"] - final_row["Investment Balance at End of Month"]
-        verdict = "Home 🏠" if delta > 0 else "Investing 📈" if delta < 0 else "Tie 🤷🏽‍♂️"
-        col3.metric("Best Option", value=verdict, delta=fmt_money(abs(delta)))
-
-
-
-
-        # Show plot summary
-        fig = go.Figure()
-
-        # Add Home Equity line
-        fig.add_trace(go.Scatter(
-            x=df["Date"],
-            y=df["Home Expected Equity"],
-            mode="lines",
-            name="Home Equity Value",
-            line=dict(width=5, color='#1f77b4')
-        ))
-
-        # Add Investment line
-        fig.add_trace(go.Scatter(
-            x=df["Date"],
-            y=df["Investment Balance at End of Month"],
-            mode="lines",
-            name="Investment Value",
-            line=dict(width=5, dash='dot', color='#ff7f0e')  # dashed line for visual separation
-        ))
-
-        # Customize layout
-        fig.update_layout(
-            title="Equity in Home vs Investment Portfolio Over Time",
-            xaxis_title="Date",
-            yaxis_title="Value",
-            yaxis_tickformat="$.2s",  # formats large numbers like 1.5M, 750K
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            margin=dict(t=40, b=20, l=40, r=20),
-            height=500
-        )
-
-        # Show plot in Streamlit
-        st.plotly_chart(fig, use_container_width=True)
+    # Results stay up while other widgets rerun the tab, and in live mode they follow every
+    # edit. Unchanged inputs reuse the session's comparison without recomputing a stage.
+    # Edits made while a run is in progress are merged by Streamlit into one rerun with
+    # the latest values, so a burst of edits computes once more, not once per edit.
+    # Loan Years is deselected by clicking it again, nothing can be compared until one is picked
+    inputs_complete = home_loan_years is not None
+    show_results = inputs_complete and (run_simulation or live_mode or st.session_state.get('shown_inputs') == inputs)
+    if (run_simulation or live_mode) and not inputs_complete:
+        st.info("Choose the Loan Years to see the comparison.")
+    if show_results:
+        st.session_state['shown_inputs'] = inputs
+
+        from contextlib import nullcontext
+        from main import Compare_Investments
+        import plotly.graph_objects as go
+
+        measure = stage_recorder.measure if stage_recorder is not None else lambda stage, compute: compute()
+
+        with stage_recorder.run('app') if stage_recorder is not None else nullcontext():
+            #Load data
+            # Reuse this session's comparison so only the stages touched by changed inputs rerun
+            if 'compare' not in st.session_state:
+                st.session_state['compare'] = Compare_Investments(**inputs, cache=schedule_cache)
+            compare = st.session_state['compare']
+            compare.instrumentation = stage_recorder
+            df = compare.update(**inputs)
+
+            # Keep a compact copy of each button run so it can be shown again and compared
+            # without recomputing. Live edits aren't saved, they would flood the history.
+            if run_simulation:
+                if 'run_history' not in st.session_state:
+                    from History import Run_History
+                    st.session_state['run_history'] = Run_History()
+                st.session_state['run_history'].add(inputs, df, label=run_label(inputs))
+
+
+            # First show results KPI.
+            final_row = df.iloc[-1]
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Final home equity", fmt_money(final_row["Home Expected Equity"]))
+            col2.metric("Final investment balance", fmt_money(final_row["Investment Balance at End of Month"]))
+
+            delta = final_row["Home Expected Equity"] - final_row["Investment Balance at End of Month"]
+            verdict = "Home 🏠" if delta > 0 else "Investing 📈" if delta < 0 else "Tie 🤷🏽‍♂️"
+            col3.metric("Best Option", value=verdict, delta=fmt_money(abs(delta)))
+
+
+            # Show plot summary. update() returns the same DataFrame when no input changed,
+            # then the figure is reused too. The key keeps the chart mounted so edits
+            # update it in place.
+            saved_figure = st.session_state.get('comparison_figure')
+            if saved_figure is not None and saved_figure[0] is df:
+                fig = saved_figure[1]
+            else:
+                fig = measure('figure', lambda: comparison_figure(df))
+                st.session_state['comparison_figure'] = (df, fig)
+            measure('render', lambda: st.plotly_chart(fig, use_container_width=True, key='comparison_chart'))
+
+            # The Arrow table goes to the browser as is, a DataFrame would be converted on every rerun
+            table = compare.comparison_table()
 
 
         #Show dataframe
         with st.expander("Show raw monthly schedule"):
-            st.dataframe(df, use_container_width=True)
+            from exports import csv_bytes, parquet_bytes
+
+            st.dataframe(table, use_container_width=True,
+                         column_config={'Date': st.column_config.DateColumn(format='YYYY-MM-DD')})
+
+            # Files are only built when a button is clicked
+            col1, col2 = st.columns(2)
+            col1.download_button("⬇️ Parquet", data=lambda: parquet_bytes(table), file_name='comparison.parquet',
+                                 mime='application/vnd.apache.parquet', on_click='ignore', use_container_width=True)
+            col2.download_button("⬇️ CSV (gzip)", data=lambda: csv_bytes(table), file_name='comparison.csv.gz',
+                                 mime='application/gzip', on_click='ignore', use_container_width=True)
+
+            cache_stats = schedule_cache.stats()
+            st.caption(f"Schedule cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                       f"{cache_stats['evictions']} evictions ({cache_stats['size']}/{cache_stats['max_size']} entries, "
+                       f"{cache_stats['hit_rate']:.0%} hit rate)")
+
+
+        # The simulation takes seconds, so it only runs on the button. Its last result is
+        # shown again while the inputs and settings it was run with don't change.
+        monte_carlo_key = (inputs, investment_volatility, appreciation_volatility, return_distribution, n_paths)
+        saved_monte_carlo = st.session_state.get('monte_carlo')
+        if run_monte_carlo and not run_simulation and (saved_monte_carlo is None or saved_monte_carlo[0] != monte_carlo_key):
+            st.caption("Press Run Comparison to simulate these inputs.")
+        elif run_monte_carlo:
+            from Simulation import Monte_Carlo_Simulation
+            from charts import line_trace, points_per_trace
+
+            if run_simulation:
+                simulation = Monte_Carlo_Simulation(home_price=home_price,
+                                            home_down_payment=home_down_payment,
+                                            home_loan_interest_perc=home_loan_interest_perc,
+                                            pmi_monthly_amt=pmi_amount,
+                                            home_loan_years=home_loan_years,
+                                            initial_additional_home_expenses=other_upfront_home_fees,
+                                            annual_home_appreciation_perc=home_value_compound,
+                                            other_fixed_monthly_payments=other_monthly_home_fees,
+                                            annual_investment_growth_perc=investment_compound,
+                                            monthly_rent_amt=monthly_rent,
+                                            annual_rent_appreciation_perc=rent_compound,
+                                            investment_volatility_perc=investment_volatility,
+                                            appreciation_volatility_perc=appreciation_volatility,
+                                            distribution=return_distribution,
+                                            n_paths=n_paths)
+                bands = measure('monte_carlo', simulation.simulate)
+                saved_monte_carlo = (monte_carlo_key, bands, simulation.probability_home_wins)
+                st.session_state['monte_carlo'] = saved_monte_carlo
+            _, bands, probability_home_wins = saved_monte_carlo
+
+            st.markdown("### Monte Carlo Simulation")
+            final_band = bands.iloc[-1]
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Median home equity", fmt_money(final_band["Home Expected Equity P50"]))
+            col2.metric("Median investment balance", fmt_money(final_band["Investment Balance at End of Month P50"]))
+            col3.metric("Chance Home Wins", f"{probability_home_wins:.0%}")
+
+            band_fig = go.Figure()
+            max_points = points_per_trace(6)
+            for column, name, color, fill in [("Home Expected Equity", "Home Equity", '#1f77b4', 'rgba(31,119,180,0.2)'),
+                                              ("Investment Balance at End of Month", "Investment", '#ff7f0e', 'rgba(255,127,14,0.2)')]:
+                band_fig.add_trace(line_trace(bands["Date"], bands[f"{column} P90"], max_points=max_points, mode="lines",
+                                              line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                band_fig.add_trace(line_trace(bands["Date"], bands[f"{column} P10"], max_points=max_points, mode="lines",
+                                              line=dict(width=0), fill='tonexty', fillcolor=fill,
+                                              name=f"{name} P10-P90"))
+                band_fig.add_trace(line_trace(bands["Date"], bands[f"{column} P50"], max_points=max_points, mode="lines",
+                                              line=dict(width=3, color=color), name=f"{name} Median"))
+
+            band_fig.update_layout(
+                title="Simulated Range of Outcomes (P10 / Median / P90)",
+                xaxis_title="Date",
+                yaxis_title="Value",
+                yaxis_tickformat="$.2s",
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                margin=dict(t=40, b=20, l=40, r=20),
+                height=500
+            )
+            st.plotly_chart(band_fig, use_container_width=True)
+
+
+    run_history = st.session_state.get('run_history')
+    if run_history is not None and len(run_history):
+        with st.expander("🕘 Run History"):
+            history_labels = {run_id: f"#{run_id} {label} ({saved_at})" for run_id, label, saved_at in run_history.runs()}
+            st.caption("The last runs of this session, shown again from memory without recomputing.")
+
+            shown_run = st.selectbox(label="Show run", options=list(history_labels), format_func=history_labels.get)
+            saved_df = run_history.frame(shown_run)
+            saved_final = saved_df.iloc[-1]
+            saved_delta = float(saved_final["Home Expected Equity"] - saved_final["Investment Balance at End of Month"])
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Final home equity", fmt_money(saved_final["Home Expected Equity"]))
+            col2.metric("Final investment balance", fmt_money(saved_final["Investment Balance at End of Month"]))
+            col3.metric("Best Option", value="Home 🏠" if saved_delta > 0 else "Investing 📈" if saved_delta < 0 else "Tie 🤷🏽‍♂️",
+                        delta=fmt_money(abs(saved_delta)))
+            st.plotly_chart(comparison_figure(saved_df), use_container_width=True)
+
+            overlay_runs = st.multiselect(label="Compare runs", options=list(history_labels),
+                                          default=list(history_labels)[:3], format_func=history_labels.get)
+            if overlay_runs:
+                st.plotly_chart(history_figure(run_history, overlay_runs, history_labels), use_container_width=True)
+
+            history_stats = run_history.stats()
+            st.caption(f"{history_stats['runs']}/{history_stats['max_runs']} runs saved, "
+                       f"{history_stats['bytes'] / 1024:,.0f} KB of {history_stats['max_bytes'] / 1024:,.0f} KB, "
+                       f"{history_stats['evictions']} evicted")
+
+
+    with st.expander("📜 Historical Backtest"):
+        st.caption("Replays the comparison for every start month in a history of monthly market returns and home price "
+                   "changes, instead of one fixed rate, to show how much the outcome depends on when you start. "
+                   "Rent and the loan keep the inputs above.")
+
+        if st.toggle(label="Backtest over history", key='run_backtest'):
+            from Backtest import HISTORY_COLUMNS, Historical_Backtest, load_historical_returns
+
+            history_file = st.file_uploader(label="Monthly history (CSV or Parquet)", key='history_file', type=['csv', 'parquet'],
+                            help=f"Columns {', '.join(HISTORY_COLUMNS)}, one row per month with returns as decimals "
+                            "(0.012 is +1.2%). No history ships with the app, build one from a public series such as "
+                            "Robert Shiller's S&P 500 total returns and the S&P/Case-Shiller U.S. National Home Price Index.")
+            use_home_history = st.toggle(label="Use historical home prices", key='use_home_history', value=True,
+                            help="Off keeps the fixed home appreciation rate above and only replays market returns.")
+
+            if history_file is None:
+                st.info(f"Upload a monthly history with the columns {', '.join(HISTORY_COLUMNS)} to run the backtest.")
+            elif not inputs_complete:
+                st.caption("Choose the Loan Years above to run the backtest.")
+            else:
+                try:
+                    backtest = Historical_Backtest(load_historical_returns(history_file), **inputs,
+                                                   use_home_history=use_home_history)
+                    backtest_results = backtest.run()
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    import numpy as np
+                    import plotly.graph_objects as go
+                    from charts import line_trace, points_per_trace
+
+                    extremes = backtest.extremes()
+                    backtest_columns = st.columns(4)
+                    for column, (name, row) in zip(backtest_columns, extremes.iterrows()):
+                        column.metric(f"{name} start: {row['Start']:%b %Y}", fmt_money(row['Delta']),
+                                      help="Final home equity minus final investment balance")
+                    backtest_columns[3].metric("Chance Home Wins", f"{backtest.probability_home_wins:.0%}",
+                                               help=f"Over {len(backtest_results):,} start months")
+
+                    delta_fig = go.Figure(line_trace(backtest_results['Start'], backtest_results['Delta'],
+                                                     max_points=points_per_trace(1), mode="lines",
+                                                     line=dict(width=2, color='#2ca02c'), name="Home - Investment"))
+                    delta_fig.add_hline(y=0, line=dict(width=1, color='gray'))
+                    delta_fig.update_layout(
+                        title="Final Home Equity minus Investment, by Start Month",
+                        xaxis_title="Start month",
+                        yaxis_title="Difference",
+                        yaxis_tickformat="$.2s",
+                        margin=dict(t=40, b=20, l=40, r=20),
+                        height=400
+                    )
+                    st.plotly_chart(delta_fig, use_container_width=True)
+
+                    paths_fig = go.Figure()
+                    max_points = points_per_trace(6)
+                    extreme_paths = backtest.schedules(extremes['Start'])
+                    for (name, row), color in zip(extremes.iterrows(), ('#d62728', '#7f7f7f', '#2ca02c')):
+                        path = extreme_paths[row['Start']]
+                        years = np.arange(len(path)) / 12
+                        paths_fig.add_trace(line_trace(years, path['Home Expected Equity'], max_points=max_points,
+                                                       mode="lines", name=f"{name} ({row['Start']:%b %Y}): Home",
+                                                       line=dict(width=3, color=color)))
+                        paths_fig.add_trace(line_trace(years, path['Investment Balance at End of Month'], max_points=max_points,
+                                                       mode="lines", name=f"{name} ({row['Start']:%b %Y}): Investment",
+                                                       line=dict(width=3, dash='dot', color=color)))
+                    paths_fig.update_layout(
+                        title="Worst, Median and Best Start Months",
+                        xaxis_title="Years since purchase",
+                        yaxis_title="Value",
+                        yaxis_tickformat="$.2s",
+                        legend=dict(orientation="h", yanchor="top", y=-0.15, xanchor="left", x=0),
+                        margin=dict(t=40, b=20, l=40, r=20),
+                        height=550
+                    )
+                    st.plotly_chart(paths_fig, use_container_width=True)
+
+
+    with st.expander("⚖️ Break-Even Finder"):
+        break_even_labels = {
+            'annual_home_appreciation_perc': 'Annual Home Appreciation Rate (%)',
+            'annual_investment_growth_perc': 'Annual Investment Compounding Rate (%)',
+            'home_loan_interest_perc': 'Loan Interest Rate (%)',
+            'annual_rent_appreciation_perc': 'Annual Rent Compounding Rate (%)',
+            'monthly_rent_amt': 'Monthly Rent Value',
+            'home_price': 'Full Home Price',
+            'home_down_payment': 'Home Down Payment',
+        }
+        st.caption("Finds the value of one input that makes the home equity and the investment balance end up equal, "
+                   "keeping every other input as set above.")
+
+        break_even_enabled = st.toggle(label="Find break-even value", key='break_even_enabled')
+        if break_even_enabled and not inputs_complete:
+            st.caption("Choose the Loan Years above to search.")
+        elif break_even_enabled:
+            from Solver import Break_Even_Solver
+
+            solver = Break_Even_Solver(inputs)
+            solve_for = st.selectbox(label="Solve for", key='break_even_input',
+                            options=list(break_even_labels), format_func=break_even_labels.get)
+            break_even_value = solver.solve(solve_for)
+
+            if math.isnan(break_even_value):
+                st.info(f"No break-even {break_even_labels[solve_for]} between {solver.search_range(solve_for)[0]:,.0f} "
+                        f"and {solver.search_range(solve_for)[1]:,.0f}. One option wins across the whole range.")
+            elif solve_for.endswith('_perc'):
+                st.metric(f"Break-even {break_even_labels[solve_for]}", f"{break_even_value:.2f}%")
+            else:
+                st.metric(f"Break-even {break_even_labels[solve_for]}", fmt_money(break_even_value))
+
+            if st.toggle(label="Show break-even curve", key='break_even_curve'):
+                curve_options = [k for k in break_even_labels if k != solve_for and k.endswith('_perc')]
+                x_name = st.selectbox(label="Against", key='break_even_curve_input',
+                            options=curve_options, format_func=break_even_labels.get)
+                x_low, x_high = st.slider(label="Range", key='break_even_curve_range',
+                            min_value=-10.0, max_value=25.0, value=(0.0, 12.0), step=0.5)
+
+                import numpy as np
+                import plotly.graph_objects as go
+
+                curve = solver.solve_curve(solve_for, x_name, np.linspace(x_low, x_high, 49))
+                curve_fig = go.Figure(go.Scatter(x=curve[x_name], y=curve[solve_for], mode="lines",
+                                                 line=dict(width=4, color='#2ca02c'), name="Break-even"))
+                curve_fig.update_layout(
+                    title=f"Break-even {break_even_labels[solve_for]}",
+                    xaxis_title=break_even_labels[x_name],
+                    yaxis_title=break_even_labels[solve_for],
+                    margin=dict(t=40, b=20, l=40, r=20),
+                    height=400
+                )
+                st.plotly_chart(curve_fig, use_container_width=True)
+
+
+    with st.expander("🏷️ Affordability"):
+        st.caption("Finds the most home you can afford while the monthly loan payment, PMI and other home fees stay under "
+                   "a share of your income in every month of the loan, using the loan settings above.")
+
+        afford_column1, afford_column2, afford_column3 = st.columns(3)
+        monthly_net_income = afford_column1.number_input(label="Monthly Net Income", key='monthly_net_income',
+                        min_value=0, max_value=None,
+                        value=8_000, step=250,
+                        help="Take-home pay per month today.")
+        salary_increase = afford_column2.number_input(label="Expected Annual Raise", key='salary_increase_perc',
+                        min_value=-10.00, max_value=None,
+                        value=3.0, step=0.25,
+                        help="Yearly raise in percent. Income steps up once a year, like rent.")
+        max_housing_share = afford_column3.number_input(label="Max Share of Income for Housing", key='max_housing_cost_perc',
+                        min_value=1.0, max_value=100.0,
+                        value=28.0, step=1.0,
+                        help="Most of your monthly income you're willing to spend on the home each month (in percent). "
+                        "28% is a common lender guideline.")
+
+        solve_affordable = st.segmented_control(label="Solve for", key='affordability_mode',
+                        options=["Max home price", "Min down payment"], default="Max home price")
+
+        if home_loan_years is None:
+            st.caption("Choose the Loan Years above to search.")
+        elif monthly_net_income > 0 and solve_affordable is not None:
+            from Affordability import Affordability_Solver
+
+            affordability = Affordability_Solver(monthly_net_income=monthly_net_income,
+                                                 expected_annual_salary_increase_perc=salary_increase,
+                                                 max_housing_cost_perc=max_housing_share,
+                                                 home_loan_interest_perc=home_loan_interest_perc,
+                                                 home_loan_years=home_loan_years,
+                                                 pmi_monthly_amt=pmi_amount,
+                                                 other_fixed_monthly_payments=other_monthly_home_fees)
+
+            if solve_affordable == "Max home price":
+                max_price = affordability.max_home_price(home_down_payment)
+                if math.isnan(max_price):
+                    st.info("The other monthly home fees alone are over budget.")
+                else:
+                    st.metric(f"Max home price with {fmt_money(home_down_payment)} down", fmt_money(max_price),
+                              delta=fmt_money(max_price - home_price))
+            else:
+                min_down = affordability.min_down_payment(home_price)
+                if math.isnan(min_down):
+                    st.info(f"A {fmt_money(home_price)} home isn't affordable even paid in full, "
+                            "the other monthly home fees alone are over budget.")
+                else:
+                    st.metric(f"Min down payment for a {fmt_money(home_price)} home", fmt_money(min_down),
+                              delta=fmt_money(home_down_payment - min_down))
+
+
+    if stage_recorder is not None:
+        with st.expander("🩺 Diagnostics"):
+            st.toggle("Capture cProfile of each run", key='diagnostics_profile')
+            st.toggle("Trace memory allocations (slower)", key='diagnostics_trace_memory')
+
+            stage_rows = stage_recorder.stage_table()
+            if not stage_rows:
+                st.caption("Run a comparison to record its stages.")
+            else:
+                import pandas as pd
+
+                stages = pd.DataFrame(stage_rows)
+                st.markdown("Stage wall time (ms) of the last runs")
+                st.dataframe(stages.pivot_table(index=['run', 'started_at'], columns='stage', values='seconds',
+                                                aggfunc='sum', sort=False).mul(1_000).round(2),
+                             use_container_width=True)
+                st.dataframe(stages, use_container_width=True, hide_index=True)
+
+                last_run = stage_recorder.runs[-1]
+                if last_run['profile']:
+                    st.code(last_run['profile'], language='text')
+
+
+with tabs[0]:
+    calculator_tab()
 
 
 st.markdown(
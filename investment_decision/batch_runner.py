@@ -0,0 +1,165 @@
+"""
+Headless batch mode for the buy vs invest comparison.
+
+Reads a CSV or Parquet file with one scenario per row (a column for every
+Compare_Investments input), evaluates the rows in chunks across a process pool and
+streams one summary row per scenario to a CSV or Parquet output as chunks finish:
+final home equity, final investment balance, verdict and break-even month.
+With --partition-by the output is instead a directory holding one hive-partitioned
+Parquet dataset (ex: results/Verdict=Home/chunk-000000-0.parquet).
+
+Only `--workers * 2` chunks are ever in flight and the output is written chunk by
+chunk, so memory stays flat however many rows the input has. Rows come out in
+input order.
+
+    python batch_runner.py scenarios.csv results.csv --workers 8
+    python batch_runner.py scenarios.parquet results.parquet --chunk-size 50000 --id-column customer_id
+    python batch_runner.py scenarios.parquet results/ --partition-by Verdict
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from Scenarios import SCENARIO_INPUTS, Compare_Scenarios
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def read_chunks(path, chunk_size, columns):
+    """
+    Yields DataFrames of at most chunk_size rows without loading the whole file
+    """
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+def summarize_chunk(chunk, first_row, id_column=None):
+    """
+    One summary row per scenario of the chunk. Runs in the worker processes.
+    """
+    missing = set(SCENARIO_INPUTS) - set(chunk.columns)
+    if missing:
+        raise ValueError(f"Input is missing columns: {sorted(missing)}")
+
+    res = (
+        Compare_Scenarios(**{name: chunk[name].to_numpy() for name in SCENARIO_INPUTS})
+        .create_comparison(break_even_month=True)
+    )
+    delta = res['Delta'].to_numpy()
+
+    ret = pd.DataFrame({'Row': np.arange(first_row, first_row + len(chunk))})
+    if id_column is not None:
+        ret[id_column] = chunk[id_column].to_numpy()
+    ret['Final Home Equity'] = res['Final Home Equity'].round(2)
+    ret['Final Investment Balance'] = res['Final Investment Balance'].round(2)
+    ret['Verdict'] = np.where(delta > 0, 'Home', np.where(delta < 0, 'Investing', 'Tie'))
+    ret['Break-Even Month'] = res['Break-Even Month']
+    return ret
+
+
+class Summary_Writer(object):
+    """
+    Appends summary chunks to a CSV or Parquet file as they arrive, or to a partitioned
+    Parquet dataset directory when partition_by is given
+    """
+    def __init__(self, path, partition_by=None):
+        self.path = path
+        self.partition_by = partition_by
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._wrote_header = False
+        self._chunks = 0
+
+    def write(self, df):
+        if self.partition_by:
+            import pyarrow as pa
+            from exports import write_partitioned
+
+            write_partitioned(pa.Table.from_pandas(df, preserve_index=False), self.path, self.partition_by,
+                              part_name=f'chunk-{self._chunks:06d}-{{i}}')
+            self._chunks += 1
+        elif self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._wrote_header else 'w', header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run(input_path, output_path, workers=None, chunk_size=20_000, id_column=None, partition_by=None):
+    """
+    Streams input_path through the pool into output_path, returns the row count.
+    partition_by: output columns to partition a Parquet dataset directory by
+    """
+    workers = workers or os.cpu_count() or 1
+    columns = list(SCENARIO_INPUTS) + ([id_column] if id_column else [])
+    writer = Summary_Writer(output_path, partition_by=partition_by)
+    in_flight = deque()
+    rows = 0
+    start = time.perf_counter()
+
+    def write_oldest():
+        nonlocal rows
+        summary = in_flight.popleft().result()
+        writer.write(summary)
+        rows += len(summary)
+        elapsed = time.perf_counter() - start
+        print(f"\r{rows:,} scenarios, {rows / elapsed:,.0f}/s", end='', file=sys.stderr, flush=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            first_row = 0
+            for chunk in read_chunks(input_path, chunk_size, columns):
+                in_flight.append(pool.submit(summarize_chunk, chunk, first_row, id_column))
+                first_row += len(chunk)
+                # Bounded queue, the reader waits on the oldest chunk instead of racing ahead
+                if len(in_flight) >= workers * 2:
+                    write_oldest()
+            while in_flight:
+                write_oldest()
+    finally:
+        writer.close()
+        print(file=sys.stderr)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV or Parquet file, one scenario per row')
+    parser.add_argument('output', help='CSV or Parquet file to write the summaries to, a directory with --partition-by')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to the CPU count')
+    parser.add_argument('--chunk-size', type=int, default=20_000, help='scenarios per task')
+    parser.add_argument('--id-column', default=None, help='input column copied to the output to identify rows')
+    parser.add_argument('--partition-by', nargs='+', default=None, metavar='COLUMN',
+                        help='write a Parquet dataset partitioned by these output columns, ex: Verdict')
+    args = parser.parse_args()
+
+    rows = run(args.input, args.output, workers=args.workers, chunk_size=args.chunk_size, id_column=args.id_column,
+               partition_by=args.partition_by)
+    print(f"Wrote {rows:,} scenario summaries to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
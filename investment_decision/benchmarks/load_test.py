@@ -0,0 +1,153 @@
+"""
+Load test for the comparison API in server.py.
+
+Opens --clients keep-alive connections that together send --requests POST /compare
+requests drawn from --distinct different scenarios, then prints throughput, latency
+percentiles, status counts and the server's own /metrics. Fewer distinct scenarios
+means more response cache hits. Standard library only.
+
+    python benchmarks/load_test.py --spawn --workers 2              # start a server for the test
+    python benchmarks/load_test.py --port 8765 --clients 64 --distinct 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from run_benchmarks import SCENARIO
+
+
+def scenario_bodies(n_distinct, seed=0):
+    rng = random.Random(seed)
+    ret = []
+    for _ in range(n_distinct):
+        scenario = dict(SCENARIO,
+                        home_loan_interest_perc=round(rng.uniform(3, 9), 3),
+                        annual_investment_growth_perc=round(rng.uniform(4, 11), 3),
+                        monthly_rent_amt=rng.randrange(1_000, 3_000, 25))
+        ret.append(json.dumps(scenario).encode())
+    return ret
+
+
+async def request(reader, writer, host, method, path, body=b''):
+    """
+    Sends one request on an open connection, returns (status, body bytes)
+    """
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, path, bodies, queue, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, 'POST', path, bodies[i])
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, n_clients, n_requests, bodies, path, seed=0):
+    rng = random.Random(seed)
+    queue = asyncio.Queue()
+    for _ in range(n_requests):
+        queue.put_nowait(rng.randrange(len(bodies)))
+
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, path, bodies, queue, latencies, statuses) for _ in range(n_clients)])
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await request(reader, writer, host, 'GET', '/metrics')
+    writer.close()
+    return elapsed, latencies, statuses, json.loads(metrics)
+
+
+async def wait_until_up(host, port, timeout=30.):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            status, _ = await request(reader, writer, host, 'GET', '/health')
+            writer.close()
+            if status == 200:
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+        await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=32, help='concurrent keep-alive connections')
+    parser.add_argument('--requests', type=int, default=2_000, help='total requests to send')
+    parser.add_argument('--distinct', type=int, default=200, help='distinct scenarios the requests are drawn from')
+    parser.add_argument('--view', choices=('summary', 'schedule'), default='summary')
+    parser.add_argument('--format', choices=('json', 'arrow'), default='json')
+    parser.add_argument('--spawn', action='store_true', help='start server.py for the test and stop it after')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes of the spawned server')
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        command = [sys.executable, 'server.py', '--host', args.host, '--port', str(args.port)]
+        if args.workers:
+            command += ['--workers', str(args.workers)]
+        server = subprocess.Popen(command, cwd=APP_DIR)
+
+    try:
+        asyncio.run(wait_until_up(args.host, args.port))
+        elapsed, latencies, statuses, metrics = asyncio.run(load_test(
+            args.host, args.port, args.clients, args.requests, scenario_bodies(args.distinct),
+            f'/compare?view={args.view}&format={args.format}'))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies_ms = sorted(seconds * 1_000 for seconds in latencies)
+    quantiles = statistics.quantiles(latencies_ms, n=100, method='inclusive')
+    print(f"{len(latencies):,} requests from {args.clients} clients in {elapsed:.2f}s "
+          f"= {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"latency ms  p50 {quantiles[49]:.2f}  p95 {quantiles[94]:.2f}  p99 {quantiles[98]:.2f}  "
+          f"max {latencies_ms[-1]:.2f}")
+    print(f"statuses    {statuses}")
+    print(f"server      computations {metrics['computations']}, coalesced {metrics['coalesced']}, "
+          f"cache hit rate {metrics['response_cache']['hit_rate']:.1%}")
+
+    return 0 if set(statuses) == {200} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
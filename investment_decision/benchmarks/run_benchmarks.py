@@ -0,0 +1,210 @@
+"""
+Benchmark suite for the investment_decision engines.
+
+Measures single scenario latency of every schedule engine for 5/15/30 year loans,
+batch throughput of Compare_Scenarios, peak traced memory and import time, writes
+the results to a JSON file and compares them against a stored baseline.
+
+Every metric is "lower is better" (seconds, seconds per scenario or bytes). A metric
+more than --tolerance above its baseline is a regression and the script exits with
+status 1, so it can gate CI. Runs offline with only the app's own requirements.
+
+    python benchmarks/run_benchmarks.py                     # run and compare
+    python benchmarks/run_benchmarks.py --update-baseline   # store a new baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, APP_DIR)
+
+BASELINE_FILEPATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_FILEPATH = os.path.join(BENCHMARK_DIR, 'results.json')
+
+LOAN_YEARS = (5, 15, 30)
+BATCH_SIZES = (1_000, 10_000, 100_000)
+
+SCENARIO = dict(home_price=450_000,
+                home_down_payment=90_000,
+                home_loan_interest_perc=6.5,
+                pmi_monthly_amt=200,
+                home_loan_years=30,
+                initial_additional_home_expenses=5_000,
+                annual_home_appreciation_perc=3.0,
+                other_fixed_monthly_payments=400,
+                annual_investment_growth_perc=8.5,
+                monthly_rent_amt=1_500,
+                annual_rent_appreciation_perc=2.0)
+
+
+def time_call(func, repeat, number=1):
+    """
+    Median wall time of one call over `repeat` timed rounds of `number` calls
+    """
+    func()  # warm up
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings)
+
+
+def peak_memory(func):
+    """
+    Peak bytes allocated through python's allocators while running func
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def import_time(module, repeat):
+    """
+    Median wall time of a fresh interpreter importing module
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], cwd=APP_DIR, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def batch_inputs(n_scenarios):
+    import numpy as np
+
+    rates = np.linspace(2, 10, n_scenarios)
+    return dict(SCENARIO, home_loan_interest_perc=rates, annual_home_appreciation_perc=rates[::-1] / 2)
+
+
+def run(repeat):
+    from Amortizer import Amortizer
+    from Renter import Renting
+    from Income import Budget
+    from Investment import Investment_Compounder
+    from main import Compare_Investments
+    from Scenarios import Compare_Scenarios
+
+    results = {}
+    for years in LOAN_YEARS:
+        scenario = dict(SCENARIO, home_loan_years=years)
+        home = Amortizer(home_price=scenario['home_price'],
+                         down_payment_amt=scenario['home_down_payment'],
+                         pmi_monthly_amt=scenario['pmi_monthly_amt'],
+                         other_fixed_monthly_home_payment=scenario['other_fixed_monthly_payments'],
+                         loan_interest_perc=scenario['home_loan_interest_perc'],
+                         loan_terms_years=years,
+                         annual_home_appreciation_perc=scenario['annual_home_appreciation_perc'])
+        rent = Renting(monthly_rent_cost=scenario['monthly_rent_amt'],
+                       annual_rent_increase_perc=scenario['annual_rent_appreciation_perc'],
+                       years=years)
+        budget = Budget(monthly_net_income=7_500,
+                        expected_annual_salary_increase_perc=3.0,
+                        years=years)
+        investment = Investment_Compounder(initial_investment=scenario['home_down_payment'],
+                                           years=years,
+                                           annual_growth_rate_perc=scenario['annual_investment_growth_perc'])
+        rents = rent.schedule()['Rent Cost']
+        payments = home.schedule()['Home Total Monthly Payments']
+
+        results[f'latency.amortizer.{years}y'] = time_call(home.schedule, repeat)
+        results[f'latency.renting.{years}y'] = time_call(rent.schedule, repeat)
+        results[f'latency.budget.{years}y'] = time_call(budget.schedule, repeat)
+        results[f'latency.investment.{years}y'] = time_call(lambda: investment.schedule(monthly_rents=rents,
+                                                                                         total_monthly_payments=payments), repeat)
+        results[f'latency.compare.{years}y'] = time_call(lambda: Compare_Investments(**scenario).create_comparison(), repeat)
+
+    results['memory.compare.30y'] = peak_memory(lambda: Compare_Investments(**SCENARIO).create_comparison())
+
+    for n_scenarios in BATCH_SIZES:
+        batch = Compare_Scenarios(**batch_inputs(n_scenarios))
+        seconds = time_call(batch.create_comparison, repeat=max(1, repeat // 3))
+        results[f'batch.seconds_per_scenario.{n_scenarios}'] = seconds / n_scenarios
+    results[f'memory.batch.{BATCH_SIZES[-1]}'] = peak_memory(Compare_Scenarios(**batch_inputs(BATCH_SIZES[-1])).create_comparison)
+
+    for module in ('main', 'Scenarios'):
+        results[f'import.{module}'] = import_time(module, repeat=max(3, repeat // 3))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns (metric, baseline, result, ratio) for every metric over tolerance
+    """
+    regressions = []
+    for metric, value in results.items():
+        if metric not in baseline:
+            continue
+        ratio = value / baseline[metric] if baseline[metric] else float('inf')
+        if ratio > 1 + tolerance:
+            regressions.append((metric, baseline[metric], value, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=15, help='timed rounds per latency metric')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed slowdown over the baseline before failing, 0.5 = 50%%')
+    parser.add_argument('--output', default=RESULTS_FILEPATH, help='where to write the results JSON')
+    parser.add_argument('--baseline', default=BASELINE_FILEPATH, help='baseline JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    width = max(len(metric) for metric in results)
+    for metric, value in results.items():
+        unit = 'bytes' if metric.startswith('memory.') else 's'
+        print(f'{metric:<{width}}  {value:>14.6g} {unit}')
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nBaseline written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'\nNo baseline at {args.baseline}, run with --update-baseline first')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f'\nNo regressions over {args.tolerance:.0%} against {args.baseline}')
+        return 0
+
+    print(f'\nREGRESSIONS over {args.tolerance:.0%} against {args.baseline}:')
+    for metric, base, value, ratio in regressions:
+        print(f'  {metric:<{width}}  {base:.6g} -> {value:.6g}  ({ratio:.2f}x)')
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Cold start report for the investment app.
+
+Imports each target in a fresh interpreter with `python -X importtime`, prints the
+slowest top level modules it pulled in and fails (exit status 1) when a target's
+total import time is over its budget.
+
+    python benchmarks/startup_report.py
+    python benchmarks/startup_report.py --top 20 --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target name -> (modules imported together, budget in seconds)
+STARTUP_BUDGETS = {
+    # Everything app.py imports before it renders the page and the inputs
+    'app first paint': (('streamlit', 'Cache', 'functions'), 1.0),
+    # Loaded on the first "Run Comparison"
+    'comparison engine': (('main',), 1.0),
+    'batch engine': (('Scenarios',), 1.0),
+}
+
+
+def import_times(modules, repeat):
+    """
+    Runs `python -X importtime` and returns {module: (self seconds, cumulative seconds, depth)}
+    from the fastest of `repeat` runs, keyed by its total.
+    """
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+                              cwd=APP_DIR, capture_output=True, text=True, check=True)
+        timings = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            depth = (len(name) - len(name.lstrip())) // 2
+            timings[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6, depth)
+
+        total = sum(cumulative for _, cumulative, depth in timings.values() if depth == 0)
+        if best is None or total < best[0]:
+            best = (total, timings)
+    return best
+
+
+def top_level_packages(timings):
+    """
+    Self time rolled up to top level packages, ex: every pandas.* submodule into pandas
+    """
+    ret = defaultdict(float)
+    for name, (self_seconds, _, _) in timings.items():
+        ret[name.split('.')[0]] += self_seconds
+    return sorted(ret.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per target, the fastest one is reported')
+    parser.add_argument('--top', type=int, default=10, help='packages to list per target')
+    parser.add_argument('--json', help='also write the report to this JSON file')
+    args = parser.parse_args()
+
+    report = {}
+    over_budget = []
+    for target, (modules, budget) in STARTUP_BUDGETS.items():
+        total, timings = import_times(modules, args.repeat)
+        packages = top_level_packages(timings)
+        report[target] = {
+            'modules': list(modules),
+            'budget_seconds': budget,
+            'import_seconds': total,
+            'packages': dict(packages),
+        }
+
+        status = 'OK' if total <= budget else 'OVER BUDGET'
+        print(f"{target} (import {', '.join(modules)}): {total:.3f}s of {budget:.3f}s budget  [{status}]")
+        for package, seconds in packages[:args.top]:
+            print(f"    {package:<30} {seconds:8.3f}s")
+        print()
+        if total > budget:
+            over_budget.append(target)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if over_budget:
+        print(f"Over the cold start budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Traces with more raw points than this are drawn with WebGL (go.Scattergl)
+WEBGL_THRESHOLD = 1_000
+
+# Most points a single trace sends to the browser after downsampling
+MAX_POINTS_PER_TRACE = 2_000
+
+# Most points a whole figure sends, split between its traces
+MAX_POINTS_PER_FIGURE = 20_000
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').view(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of n_out points
+    (always including the first and last) that keep the visual shape of the series:
+    from every bucket it picks the point forming the largest triangle with the point
+    picked in the previous bucket and the average of the next bucket. Points are
+    picked from the data, never interpolated, so every drawn value is exact.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    # Bucket averages through cumsums, so each bucket's mean is O(1)
+    x_sums = np.concatenate([[0.], np.cumsum(x)])
+    y_sums = np.concatenate([[0.], np.cumsum(y)])
+
+    ret = np.empty(n_out, dtype=np.int64)
+    ret[0], ret[-1] = 0, n - 1
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_start = end
+        count = next_end - next_start
+        avg_x = (x_sums[next_end] - x_sums[next_start]) / count
+        avg_y = (y_sums[next_end] - y_sums[next_start]) / count
+
+        area = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected])
+                      - (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        ret[i + 1] = selected
+    return ret
+
+
+def line_trace(x, y, max_points=MAX_POINTS_PER_TRACE, webgl_threshold=WEBGL_THRESHOLD, **trace_kwargs):
+    """
+    Line trace that stays cheap to send and draw however long the series is.
+    Series longer than max_points are downsampled with LTTB, and series longer than
+    webgl_threshold are drawn with WebGL. Hover shows the exact value of every drawn
+    point, but only the drawn points: zooming happens in the browser on the points that
+    were sent, and Streamlit doesn't send plotly's zoom events back, so a downsampled
+    series gains no detail when zoomed in.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    trace_type = go.Scattergl if len(y) > webgl_threshold else go.Scatter
+    idx = lttb_indices(x, y, max_points)
+    return trace_type(x=x[idx], y=y[idx], **trace_kwargs)
+
+
+def points_per_trace(n_traces, max_points=MAX_POINTS_PER_TRACE, figure_points=MAX_POINTS_PER_FIGURE):
+    """
+    Per trace point budget so a figure with n_traces stays within figure_points
+    """
+    return max(3, min(max_points, figure_points // max(1, n_traces)))
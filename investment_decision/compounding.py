@@ -0,0 +1,48 @@
+import numpy as np
+
+# Compounding (or step) periods per year, None is continuous
+FREQUENCIES = {
+    'daily': 365,
+    'monthly': 12,
+    'quarterly': 4,
+    'annual': 1,
+    'continuous': None,
+}
+
+
+def periods_per_year(frequency):
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency {frequency!r}, choose one of {tuple(FREQUENCIES)}")
+    return FREQUENCIES[frequency]
+
+
+def effective_monthly_rate(annual_rate, frequency='monthly'):
+    """
+    Monthly rate growing money as much as a nominal annual_rate compounded at frequency,
+    ex: 8% compounded daily is (1 + 0.08/365) ** (365/12) - 1 a month. Monthly is exactly
+    annual_rate / 12. Accepts scalars or numpy arrays.
+    """
+    k = periods_per_year(frequency)
+    annual_rate = np.asarray(annual_rate, dtype=float)
+    if k == 12:
+        ret = annual_rate / 12
+    elif k is None:
+        ret = np.expm1(annual_rate / 12)
+    else:
+        ret = np.expm1(k / 12 * np.log1p(annual_rate / k))
+    return ret.item() if ret.ndim == 0 else ret
+
+
+def step_growth(annual_rate, months, frequency='annual'):
+    """
+    Growth of 1 after `months` whole months when the value only steps up at the end of
+    each period of frequency, ex: yearly rent increases are (1 + r) ** (months // 12).
+    Continuous grows every month. Closed form, broadcasts rates against months.
+    """
+    k = periods_per_year(frequency)
+    annual_rate = np.asarray(annual_rate, dtype=float)
+    months = np.asarray(months)
+    if k is None:
+        return np.exp(annual_rate * months / 12)
+    # Periods finished by the end of each month, ex: days elapsed for daily
+    return (1 + annual_rate / k) ** (months * k // 12)
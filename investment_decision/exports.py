@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+
+# pyarrow is imported inside the functions so the engines keep working without it
+
+
+def schedule_table(df):
+    """
+    Arrow table of a schedule DataFrame (or dict of columns). Date becomes date32 and the
+    numeric columns are handed to Arrow as their numpy buffers, without a copy.
+    """
+    import pyarrow as pa
+
+    columns = {}
+    for name in df:
+        values = np.asarray(df[name])
+        if np.issubdtype(values.dtype, np.datetime64):
+            columns[name] = pa.array(values.astype('datetime64[D]'), type=pa.date32())
+        else:
+            columns[name] = pa.array(values)
+    return pa.table(columns)
+
+
+def parquet_bytes(table, compression='zstd'):
+    import pyarrow.parquet as pq
+
+    sink = io.BytesIO()
+    pq.write_table(table, sink, compression=compression)
+    return sink.getvalue()
+
+
+def csv_bytes(table, compression='gzip'):
+    """
+    table as CSV, compressed with compression unless it is None
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    sink = pa.BufferOutputStream()
+    stream = sink if compression is None else pa.CompressedOutputStream(sink, compression)
+    pacsv.write_csv(table, stream)
+    if stream is not sink:
+        stream.close()
+    return sink.getvalue().to_pybytes()
+
+
+def write_partitioned(table, root, partition_cols, part_name='part-{i}'):
+    """
+    Adds table to the hive-partitioned Parquet dataset at root (ex: root/Verdict=Home/...).
+    Every call writes new files named after part_name, so a dataset can be built a chunk
+    at a time. Read it back with pyarrow.dataset.dataset(root, partitioning='hive').
+    """
+    import pyarrow.parquet as pq
+
+    pq.write_to_dataset(table, root, partition_cols=list(partition_cols),
+                        basename_template=part_name + '.parquet', compression='zstd',
+                        existing_data_behavior='overwrite_or_ignore')
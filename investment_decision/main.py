@@ -1,11 +1,35 @@
+from functools import partial
+
+import numpy as np
 import pandas as pd
-from Amortizer import Amortizer
+from Amortizer import Amortizer, normalize_events
 from Investment import Investment_Compounder
 from Renter import Renting
+from Cache import normalize_key
 # import seaborn as sns
 # import matplotlib.pyplot as plt
 # import matplotlib.ticker as mtick
 
+# Inputs each stage is built from. Changing one of them only recomputes the stages
+# that list it, plus the stages downstream of those in STAGE_DEPENDENCIES.
+STAGE_INPUTS = {
+    'rent': ('monthly_rent_amt', 'annual_rent_appreciation_perc', 'home_loan_years', 'rent_increase_frequency'),
+    'home': ('home_price', 'home_down_payment', 'home_loan_interest_perc', 'pmi_monthly_amt',
+             'home_loan_years', 'annual_home_appreciation_perc', 'other_fixed_monthly_payments',
+             'home_loan_events', 'home_appreciation_frequency'),
+    'investment': ('home_down_payment', 'initial_additional_home_expenses',
+                   'annual_investment_growth_perc', 'home_loan_years', 'investment_compounding'),
+    'comparison': (),
+}
+
+STAGE_DEPENDENCIES = {
+    'rent': (),
+    'home': (),
+    'investment': ('rent', 'home'),
+    'comparison': ('rent', 'home', 'investment'),
+}
+
+
 class Compare_Investments(object):
     """
     Compares two investment classes. Classes are structured
@@ -25,65 +49,233 @@ class Compare_Investments(object):
                  annual_investment_growth_perc, 
                  monthly_rent_amt,
                  annual_rent_appreciation_perc,        
+                 home_loan_events=None,
+                 investment_compounding='monthly',
+                 home_appreciation_frequency='monthly',
+                 rent_increase_frequency='annual',
+                 cache=None,
+                 dtype=np.float64,
+                 exact_cents=False,
+                 instrumentation=None,
     ):
-        
+        """
+        home_loan_events: optional Amortizer.Loan_Events (or dicts of their arguments),
+        prepayments, extra principal, recasts and refinances of the home loan
+        investment_compounding, home_appreciation_frequency, rent_increase_frequency: how
+        often the investment compounds and the home value and rent step up, one of
+        compounding.FREQUENCIES
+        cache: optional LRU_Cache shared between instances. Each sub-schedule is cached
+        under only the inputs it depends on, so changing the rent inputs reuses the
+        cached amortization schedule and vice versa.
+        dtype: float type of the schedules' money columns, np.float32 halves memory
+        exact_cents: amortize the loan in int64 cents with bank rounding, see Amortizer
+        instrumentation: optional Instrumentation.Stage_Recorder timing every stage of
+        create_comparison, when None the stages run with no measuring at all
+        """
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self.dtype = np.dtype(dtype)
+        self.exact_cents = exact_cents
+        self.start_date = str(pd.Timestamp('today').replace(day=1).date())
 
-        self.home_investment = Amortizer(home_price=home_price,
-                                         down_payment_amt=home_down_payment,
-                                         pmi_monthly_amt=pmi_monthly_amt,
-                                         other_fixed_monthly_home_payment=other_fixed_monthly_payments,
-                                         loan_interest_perc=home_loan_interest_perc,
-                                         loan_terms_years=home_loan_years,
-                                         annual_home_appreciation_perc=annual_home_appreciation_perc)
-        
-        self.rent_table = Renting(monthly_rent_cost=monthly_rent_amt,
-                                  annual_rent_increase_perc=annual_rent_appreciation_perc,
-                                  years=home_loan_years)
-
-
-        initial_investment = home_down_payment + initial_additional_home_expenses
-        self.alternative_investment = Investment_Compounder(initial_investment=initial_investment,
-                                                  years=home_loan_years,
-                                                  annual_growth_rate_perc=annual_investment_growth_perc)
-        
+        self.inputs = dict(home_price=home_price,
+                           home_down_payment=home_down_payment,
+                           home_loan_interest_perc=home_loan_interest_perc,
+                           pmi_monthly_amt=pmi_monthly_amt,
+                           home_loan_years=home_loan_years,
+                           initial_additional_home_expenses=initial_additional_home_expenses,
+                           annual_home_appreciation_perc=annual_home_appreciation_perc,
+                           other_fixed_monthly_payments=other_fixed_monthly_payments,
+                           annual_investment_growth_perc=annual_investment_growth_perc,
+                           monthly_rent_amt=monthly_rent_amt,
+                           annual_rent_appreciation_perc=annual_rent_appreciation_perc,
+                           home_loan_events=normalize_events(home_loan_events),
+                           investment_compounding=investment_compounding,
+                           home_appreciation_frequency=home_appreciation_frequency,
+                           rent_increase_frequency=rent_increase_frequency)
 
-        
+        self._build_home()
+        self._build_rent()
+        self._build_investment()
 
         self.income_df = pd.DataFrame({})
         self.home_schedule_df = pd.DataFrame({})
         self.investment_df = pd.DataFrame({})
         self.renting_df = pd.DataFrame({})
-    
+        self.comparison_df = pd.DataFrame({})
+        self._comparison_table = None
+
+        # Stages whose output is out of date with self.inputs
+        self.dirty_stages = set(STAGE_INPUTS)
+
+    def _build_home(self):
+        self.home_investment = Amortizer(home_price=self.inputs['home_price'],
+                                         down_payment_amt=self.inputs['home_down_payment'],
+                                         pmi_monthly_amt=self.inputs['pmi_monthly_amt'],
+                                         other_fixed_monthly_home_payment=self.inputs['other_fixed_monthly_payments'],
+                                         loan_interest_perc=self.inputs['home_loan_interest_perc'],
+                                         loan_terms_years=self.inputs['home_loan_years'],
+                                         annual_home_appreciation_perc=self.inputs['annual_home_appreciation_perc'],
+                                         events=self.inputs['home_loan_events'],
+                                         appreciation_frequency=self.inputs['home_appreciation_frequency'],
+                                         exact_cents=self.exact_cents,
+                                         dtype=self.dtype,
+                                         start_date=self.start_date)
+
+    def _build_rent(self):
+        self.rent_table = Renting(monthly_rent_cost=self.inputs['monthly_rent_amt'],
+                                  annual_rent_increase_perc=self.inputs['annual_rent_appreciation_perc'],
+                                  years=self.inputs['home_loan_years'],
+                                  increase_frequency=self.inputs['rent_increase_frequency'],
+                                  start_date=self.start_date)
+
+    def _build_investment(self):
+        initial_investment = self.inputs['home_down_payment'] + self.inputs['initial_additional_home_expenses']
+        self.alternative_investment = Investment_Compounder(initial_investment=initial_investment,
+                                                  years=self.inputs['home_loan_years'],
+                                                  annual_growth_rate_perc=self.inputs['annual_investment_growth_perc'],
+                                                  compounding=self.inputs['investment_compounding'],
+                                                  dtype=self.dtype,
+                                                  start_date=self.start_date)
+
+    def _stage_inputs(self, stage):
+        """
+        Every input the stage's output depends on, including its upstream stages
+        """
+        ret = {name: self.inputs[name] for name in STAGE_INPUTS[stage]}
+        for upstream in STAGE_DEPENDENCIES[stage]:
+            ret.update({f'{upstream}.{k}': v for k, v in self._stage_inputs(upstream).items()})
+        ret['start_date'] = self.start_date
+        ret['dtype'] = self.dtype.name
+        ret['exact_cents'] = self.exact_cents
+        return ret
+
+    def _measured(self, stage, compute):
+        if self.instrumentation is None:
+            return compute()
+        return self.instrumentation.measure(stage, compute)
+
+    def _cached(self, stage, compute):
+        if self.cache is not None:
+            compute = partial(self.cache.get_or_compute, normalize_key(stage, self._stage_inputs(stage)), compute)
+        ret = self._measured(stage, compute)
+        self.dirty_stages.discard(stage)
+        return ret
+
+    def update(self, **changes):
+        """
+        Updates inputs in place and returns the refreshed comparison. Only the stages
+        depending on a changed input (and the stages downstream of them) are recomputed.
+        ex: compare.update(annual_investment_growth_perc=9.0) reuses the rent and
+        amortization schedules.
+        """
+        unknown = set(changes) - set(self.inputs)
+        if unknown:
+            raise TypeError(f"update() got unexpected inputs: {sorted(unknown)}")
+        if 'home_loan_events' in changes:
+            changes['home_loan_events'] = normalize_events(changes['home_loan_events'])
+
+        changed = {name for name, value in changes.items() if self.inputs[name] != value}
+        self.inputs.update(changes)
+
+        # Every schedule starts in the month the instance was built, an instance kept
+        # across a month boundary (ex: in a session) moves all of them to the new month
+        start_date = str(pd.Timestamp('today').replace(day=1).date())
+        if start_date != self.start_date:
+            self.start_date = start_date
+            changed = set(self.inputs)
+
+        builders = {'home': self._build_home, 'rent': self._build_rent, 'investment': self._build_investment}
+        for stage, names in STAGE_INPUTS.items():
+            if changed.intersection(names):
+                builders[stage]()
+                self.dirty_stages.add(stage)
+
+        for stage, upstream in STAGE_DEPENDENCIES.items():
+            if self.dirty_stages.intersection(upstream):
+                self.dirty_stages.add(stage)
+
+        return self.create_comparison()
+
+    def break_even(self, input_name, lower=None, upper=None):
+        """
+        Value of input_name that makes final home equity equal the final investment
+        balance, every other input held at its current value. NaN when there is no
+        tie within [lower, upper], see Solver.Break_Even_Solver.
+        """
+        from Solver import Break_Even_Solver
+
+        if self.inputs['home_loan_events']:
+            raise ValueError("break_even doesn't support home_loan_events, the batch engine has no loan events")
+        if (self.inputs['investment_compounding'], self.inputs['home_appreciation_frequency'],
+                self.inputs['rent_increase_frequency']) != ('monthly', 'monthly', 'annual'):
+            raise ValueError("break_even only supports the default frequencies of the batch engine")
+        return Break_Even_Solver(self.inputs).solve(input_name, lower=lower, upper=upper)
+
+    def loan_payoff(self):
+        """
+        Payoff month and date, lifetime interest and interest saved by the loan events,
+        see Amortizer.payoff_summary
+        """
+        return self.home_investment.payoff_summary()
+
     def create_amortization_schedule(self):
-        self.home_schedule_df = self.home_investment.schedule()
+        self.home_schedule_df = self._cached('home', self.home_investment.schedule)
         return self.home_schedule_df
     
     
     def create_rent_schedule(self):
-        self.renting_df = self.rent_table.schedule()
+        self.renting_df = self._cached('rent', self.rent_table.schedule)
         return self.renting_df
 
     def create_investment_schedule(self):
         total_month_home_expenses = self.home_schedule_df['Home Total Monthly Payments']
         monthly_rents = self.renting_df['Rent Cost']
 
-        self.investment_df = self.alternative_investment.schedule(monthly_rents=monthly_rents,
-                                                                  total_monthly_payments=total_month_home_expenses)
+        self.investment_df = self._cached('investment',
+                                          lambda: self.alternative_investment.schedule(monthly_rents=monthly_rents,
+                                                                                       total_monthly_payments=total_month_home_expenses))
         return self.investment_df
 
     def create_comparison(self):
-        rent = self.create_rent_schedule()
-        home = self.create_amortization_schedule()
-        investment = self.create_investment_schedule()
-
-        df = (
-            rent
-            .merge(right=home, how='inner', on='Date')
-            .merge(right=investment, how='inner', on='Date')
-            .assign(
-                Date = lambda df: pd.to_datetime(df['Date']).dt.date,
-            )
-        )
+        """
+        Builds the rent, home and investment schedules and lines them up month by month.
+        Stages that are up to date with the inputs are reused.
+        """
+        # Nothing to recompute, an empty run would only push real runs out of the recorder
+        if self.instrumentation is None or not self.dirty_stages:
+            return self._create_comparison()
+        with self.instrumentation.run('comparison'):
+            return self._create_comparison()
+
+    def _create_comparison(self):
+        if 'rent' in self.dirty_stages:
+            self.create_rent_schedule()
+        if 'home' in self.dirty_stages:
+            self.create_amortization_schedule()
+        if 'investment' in self.dirty_stages:
+            self.create_investment_schedule()
+        if 'comparison' not in self.dirty_stages:
+            return self.comparison_df
+
+        rent, home, investment = self.renting_df, self.home_schedule_df, self.investment_df
+
+        # Every schedule is a monthly range from the same start month, so row i is month i
+        # in all three and they can be lined up by position instead of joined on Date.
+        periods = {'rent': len(rent), 'home': len(home), 'investment': len(investment)}
+        if len(set(periods.values())) != 1:
+            raise ValueError(f"Schedules have different period counts: {periods}")
+        for name, schedule in (('home', home), ('investment', investment)):
+            if not np.array_equal(schedule['Date'].values, rent['Date'].values):
+                raise ValueError(f"The {name} schedule's dates don't line up with the rent schedule")
+
+        def merge():
+            return pd.concat([rent.reset_index(drop=True),
+                              home.drop(columns='Date').reset_index(drop=True),
+                              investment.drop(columns='Date').reset_index(drop=True)],
+                             axis=1, copy=False)
+
+        df = self._measured('merge', merge)
         
 
         # if plot == True:
@@ -101,7 +293,21 @@ class Compare_Investments(object):
         #     plt.show()
 
 
+        self.comparison_df = df
+        self._comparison_table = None
+        self.dirty_stages.discard('comparison')
         return df
+
+    def comparison_table(self):
+        """
+        The comparison as a pyarrow Table with a date32 Date column, built from the
+        schedule's numpy columns without copying them. Kept until the comparison changes.
+        """
+        df = self.create_comparison()
+        if self._comparison_table is None:
+            from exports import schedule_table
+            self._comparison_table = self._measured('arrow', lambda: schedule_table(df))
+        return self._comparison_table
     
 
 # home_price = 320_000
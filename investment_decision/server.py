@@ -0,0 +1,335 @@
+"""
+Local HTTP API for the buy vs invest comparison, so other services can call the
+engine without going through the Streamlit UI. Standard library asyncio only, no web
+framework.
+
+    GET  /health              liveness check
+    GET  /metrics             request counts, latency percentiles, throughput, cache stats
+    POST /compare             JSON body with every Compare_Investments input
+         ?view=summary        final equity, final investment, verdict, break-even month (default)
+         ?view=schedule       the full month by month comparison
+         ?format=json|arrow   arrow returns an Arrow IPC stream (needs pyarrow), also
+                              picked by `Accept: application/vnd.apache.arrow.stream`
+
+The event loop only parses requests and writes responses. Comparisons run and are
+serialized in a process pool, identical requests are answered from a bounded LRU
+response cache, and identical requests arriving while one is being computed wait on
+that computation instead of starting another.
+
+    python server.py --port 8765 --workers 4
+    curl -X POST localhost:8765/compare -d '{"home_price": 450000, ...}'
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from Cache import LRU_Cache, normalize_key
+from Scenarios import SCENARIO_INPUTS, first_month_ahead
+
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+VIEWS = ('summary', 'schedule')
+FORMATS = ('json', 'arrow')
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100
+
+STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                  413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+# Stage cache of each worker process, see compare()
+_worker_cache = None
+
+
+class Http_Error(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def parse_inputs(body):
+    """
+    Compare_Investments inputs from a JSON request body, raises Http_Error(400) when
+    an input is missing, unknown or not a number.
+    """
+    try:
+        inputs = json.loads(body or b'{}')
+    except ValueError as e:
+        raise Http_Error(400, f"Body is not valid JSON: {e}")
+    if not isinstance(inputs, dict):
+        raise Http_Error(400, "Body must be a JSON object of inputs")
+
+    missing = set(SCENARIO_INPUTS) - set(inputs)
+    unknown = set(inputs) - set(SCENARIO_INPUTS)
+    if missing or unknown:
+        raise Http_Error(400, f"Missing inputs: {sorted(missing)}, unknown inputs: {sorted(unknown)}")
+
+    for name, value in inputs.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+            raise Http_Error(400, f"{name} must be a finite number")
+    if inputs['home_loan_years'] != int(inputs['home_loan_years']) or not 1 <= inputs['home_loan_years'] <= 50:
+        raise Http_Error(400, "home_loan_years must be a whole number of years between 1 and 50")
+    inputs['home_loan_years'] = int(inputs['home_loan_years'])
+    return inputs
+
+
+def summarize(df, inputs):
+    """
+    Summary of a Compare_Investments comparison
+    """
+    equity = df['Home Expected Equity'].to_numpy()
+    investment = df['Investment Balance at End of Month'].to_numpy()
+    delta = float(equity[-1] - investment[-1])
+    month = int(first_month_ahead(equity[None, :], investment[None, :])[0])
+    return {
+        'inputs': inputs,
+        'Months': len(df),
+        'Final Home Equity': round(float(equity[-1]), 2),
+        'Final Investment Balance': round(float(investment[-1]), 2),
+        'Delta': round(delta, 2),
+        'Verdict': 'Home' if delta > 0 else 'Investing' if delta < 0 else 'Tie',
+        'Break-Even Month': None if month < 0 else month,
+    }
+
+
+def to_arrow_stream(table):
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def compare(inputs, view, fmt):
+    """
+    Runs one comparison and serializes it, returns (content type, body bytes).
+    Runs in the worker processes, each keeps its own stage cache so requests that only
+    change the rent or investment inputs reuse the amortization schedule.
+    """
+    global _worker_cache
+    from main import Compare_Investments
+
+    if _worker_cache is None:
+        _worker_cache = LRU_Cache(max_size=256)
+
+    df = Compare_Investments(**inputs, cache=_worker_cache).create_comparison()
+    if view == 'summary':
+        summary = summarize(df, inputs)
+        if fmt == 'json':
+            return 'application/json', json.dumps(summary).encode()
+        import pyarrow as pa
+        return ARROW_CONTENT_TYPE, to_arrow_stream(pa.Table.from_pylist([{k: v for k, v in summary.items() if k != 'inputs'}]))
+
+    if fmt == 'json':
+        body = df.assign(Date=df['Date'].dt.strftime('%Y-%m-%d')).to_json(orient='split', index=False)
+        return 'application/json', body.encode()
+    from exports import schedule_table
+    return ARROW_CONTENT_TYPE, to_arrow_stream(schedule_table(df))
+
+
+class Server_Metrics(object):
+    """
+    Request counters and a rolling window of request latencies
+    """
+    def __init__(self, window=10_000):
+        self.started = time.monotonic()
+        self.requests = Counter()   # route -> count
+        self.statuses = Counter()   # status code -> count
+        self.computations = 0
+        self.coalesced = 0
+        self.in_flight = 0
+        self._latencies = deque(maxlen=window) # (finished at, seconds)
+
+    def record(self, route, status, seconds):
+        self.requests[route] += 1
+        self.statuses[status] += 1
+        self._latencies.append((time.monotonic(), seconds))
+
+    def snapshot(self, cache):
+        now = time.monotonic()
+        latencies = np.array([seconds for _, seconds in self._latencies])
+        recent = sum(1 for finished, _ in self._latencies if finished > now - 10)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1_000 if len(latencies) else (0., 0., 0.)
+        return {
+            'uptime_seconds': round(now - self.started, 3),
+            'requests': dict(self.requests),
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'in_flight': self.in_flight,
+            'computations': self.computations,
+            'coalesced': self.coalesced,
+            'throughput_rps_10s': round(recent / min(10., max(now - self.started, 1e-9)), 2),
+            'latency_ms': {'p50': round(p50, 3), 'p95': round(p95, 3), 'p99': round(p99, 3),
+                           'window': len(latencies)},
+            'response_cache': cache.stats(),
+        }
+
+
+class Comparison_Server(object):
+    """
+    asyncio HTTP/1.1 server with keep-alive. Comparisons go to a process pool so the
+    event loop never blocks on them.
+    """
+    def __init__(self, workers=None, cache_size=1_024, cache_ttl_seconds=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 64
+        self.cache = LRU_Cache(max_size=cache_size, ttl_seconds=cache_ttl_seconds)
+        self.metrics = Server_Metrics()
+        self.pool = None
+        self._pending = {}  # cache key -> future of the computation in progress
+
+    async def compute(self, inputs, view, fmt):
+        # Schedules start in the current month, a response cached last month has stale dates
+        key = normalize_key(('compare', view, fmt, time.strftime('%Y-%m')), inputs)
+        missing = object()
+        ret = self.cache.get(key, missing)
+        if ret is not missing:
+            return ret
+
+        future = self._pending.get(key)
+        if future is not None:
+            self.metrics.coalesced += 1
+            return await asyncio.shield(future)
+        if len(self._pending) >= self.max_pending:
+            raise Http_Error(503, "Too many comparisons in progress, retry shortly")
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, compare, inputs, view, fmt)
+        self._pending[key] = future
+        self.metrics.computations += 1
+        try:
+            ret = await asyncio.shield(future)
+        finally:
+            self._pending.pop(key, None)
+        self.cache.put(key, ret)
+        return ret
+
+    async def route(self, method, target, headers, body):
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            return 200, 'application/json', b'{"status": "ok"}'
+        if url.path == '/metrics':
+            return 200, 'application/json', json.dumps(self.metrics.snapshot(self.cache)).encode()
+        if url.path != '/compare':
+            raise Http_Error(404, f"No route {url.path}")
+        if method != 'POST':
+            raise Http_Error(405, "Use POST /compare with a JSON body")
+
+        view = query.get('view', 'summary')
+        accept = headers.get('accept', '')
+        fmt = query.get('format', 'arrow' if ARROW_CONTENT_TYPE in accept else 'json')
+        if view not in VIEWS or fmt not in FORMATS:
+            raise Http_Error(400, f"view must be one of {VIEWS} and format one of {FORMATS}")
+
+        content_type, payload = await self.compute(parse_inputs(body), view, fmt)
+        return 200, content_type, payload
+
+    async def handle(self, reader, writer):
+        """
+        Serves the requests of one connection until the client closes it
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                method, target, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                content_length = headers.get('content-length', '0')
+                length = None
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                route = urlsplit(target).path
+
+                self.metrics.in_flight += 1
+                try:
+                    # isdecimal rejects negative lengths, and accepts exactly what int() parses
+                    if not content_length.isdecimal():
+                        raise Http_Error(400, f"Invalid Content-Length {content_length!r}")
+                    length = int(content_length)
+                    if length > MAX_BODY_BYTES:
+                        raise Http_Error(413, f"Body over {MAX_BODY_BYTES} bytes")
+                    body = await reader.readexactly(length) if length else b''
+                    status, content_type, payload = await self.route(method, target, headers, body)
+                except Http_Error as e:
+                    status, content_type, payload = e.status, 'application/json', json.dumps({'error': e.message}).encode()
+                    # Without a valid length the rest of the body can't be skipped
+                    keep_alive = keep_alive and length is not None and e.status != 413
+                except Exception as e:
+                    status, content_type, payload = 500, 'application/json', json.dumps({'error': repr(e)}).encode()
+                finally:
+                    self.metrics.in_flight -= 1
+
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload
+                )
+                await writer.drain()
+                self.metrics.record(route, status, time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, ready=None):
+        with ProcessPoolExecutor(max_workers=self.workers) as self.pool:
+            server = await asyncio.start_server(self.handle, host, port, backlog=1_024)
+            print(f"Serving on http://{host}:{port} with {self.workers} workers", file=sys.stderr, flush=True)
+            if ready is not None:
+                ready.set()
+            async with server:
+                await server.serve_forever()
+
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to the CPU count')
+    parser.add_argument('--cache-size', type=int, default=1_024, help='responses kept in the LRU cache')
+    parser.add_argument('--cache-ttl', type=float, default=None, help='seconds a cached response stays valid')
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='comparisons computing at once before answering 503, defaults to 64 per worker')
+    args = parser.parse_args()
+
+    server = Comparison_Server(workers=args.workers, cache_size=args.cache_size,
+                               cache_ttl_seconds=args.cache_ttl, max_pending=args.max_pending)
+    # Stop on SIGTERM the way Ctrl-C does, so the worker processes are shut down too
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
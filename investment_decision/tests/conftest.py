@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app's modules import each other flat, as when run from investment_decision/
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
@@ -0,0 +1,145 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from Amortizer import Amortizer
+
+
+def reference_schedule(home_price,
+                       down_payment_amt,
+                       pmi_monthly_amt,
+                       other_fixed_monthly_home_payment,
+                       loan_interest_perc,
+                       loan_terms_years,
+                       annual_home_appreciation_perc,
+                       start_date,
+):
+    """
+    The row by row Amortizer.schedule loop the vectorized engine replaced, kept as the
+    reference it is checked against
+    """
+    loan_amount = home_price - down_payment_amt
+    monthly_rt = loan_interest_perc / 100 / 12
+    appreciation_monthly_rate = annual_home_appreciation_perc / 100 / 12
+    loan_periods = loan_terms_years * 12
+    date_range = pd.date_range(start=start_date, periods=loan_periods+1, freq='MS')
+
+    #Equal Monthly Installments (EMI)
+    if monthly_rt == 0.:
+        EMI = loan_amount/loan_periods
+    else:
+        EMI = loan_amount * (monthly_rt * (1+monthly_rt) ** loan_periods / (((1+monthly_rt)**loan_periods) - 1))
+    EMI = round(EMI, 2)
+
+    data = []
+    for i, date in enumerate(date_range):
+        if i == 0:
+            balance = loan_amount
+            interest = 0.00
+            principal = 0.00
+            home_market_value = home_price
+
+            row = {
+                'Date': date,
+                'Home Outstanding Balance': balance,
+                'Home Payment Amount': 0.00,
+                'Home Interest Payment': interest,
+                'Home Principal Payment': principal,
+                'Home PMI Payment': 0.00, #no payment first month
+                'Home Oth. Fixed Payments': 0.00, #no payment first month
+                'Home Total Monthly Payments': 0.00,
+                'Home Cumulative Interest Paid': 0.00,
+                'Home Cumulative Principal Paid': 0.00,
+                'Home Cumulative PMI Paid': 0.00,
+                'Home Cumulative Total Payments': 0.00,
+                'Home Expected Value': home_market_value,
+                'Home Expected Equity': home_market_value - balance
+            }
+        else:
+            interest = round(balance * monthly_rt, 2)
+            principal = EMI - interest
+            balance = max(0, balance - principal)
+            home_market_value = round(home_market_value * (1+appreciation_monthly_rate), 2)
+
+            if balance <= home_price * 0.80:
+                pmi = 0.00
+            else:
+                pmi = pmi_monthly_amt
+
+            total_payments_for_month = EMI + pmi + other_fixed_monthly_home_payment
+
+            cumu_interest_paid = sum(i['Home Interest Payment'] for i in data) + interest
+            cumu_principal_paid = sum(i['Home Principal Payment'] for i in data) + principal
+            cumu_pmi_paid = sum(i['Home PMI Payment'] for i in data) + pmi
+            cumu_other_fixed_payments = sum(i['Home Oth. Fixed Payments'] for i in data) + other_fixed_monthly_home_payment
+            cumu_total_payments = cumu_interest_paid + cumu_principal_paid + cumu_pmi_paid + cumu_other_fixed_payments
+
+            row = {
+                'Date': date,
+                'Home Outstanding Balance': balance,
+                'Home Payment Amount': EMI,
+                'Home Interest Payment': interest,
+                'Home Principal Payment': principal,
+                'Home PMI Payment': pmi,
+                'Home Oth. Fixed Payments': other_fixed_monthly_home_payment,
+                'Home Total Monthly Payments': total_payments_for_month,
+                'Home Cumulative Interest Paid': cumu_interest_paid,
+                'Home Cumulative Principal Paid': cumu_principal_paid,
+                'Home Cumulative PMI Paid': cumu_pmi_paid,
+                'Home Cumulative Total Payments': cumu_total_payments,
+                'Home Expected Value': home_market_value,
+                'Home Expected Equity': home_market_value - balance,
+            }
+        data.append(row)
+
+    return pd.DataFrame(data)
+
+
+def rounding_tolerance(months, annual_rate_perc):
+    """
+    The documented tolerance of Amortizer.schedule_arrays: half a cent per month,
+    compounded at the monthly rate, plus a cent for the final rounding
+    """
+    rate = annual_rate_perc / 100 / 12
+    if rate == 0:
+        return 0.005 * months + 0.01
+    return 0.005 * ((1+rate) ** months - 1) / rate + 0.01
+
+
+START_DATE = pd.Timestamp('2025-01-01')
+
+# The Amortizer in the app's example: PMI is charged until the balance is under 80% of
+# the price, about 10 years into a 30 year loan at 6%
+HOME_PRICE = 450_000
+DOWN_PAYMENT = 45_000
+OTHER_FIXED_PAYMENTS = 300
+APPRECIATION_PERC = 4.5
+
+
+@pytest.mark.parametrize('loan_terms_years, loan_interest_perc, pmi_monthly_amt',
+                         list(itertools.product((5, 15, 30), (0., 3.25, 6., 15.), (0., 250.))))
+def test_schedule_matches_reference_loop(loan_terms_years, loan_interest_perc, pmi_monthly_amt):
+    args = (HOME_PRICE, DOWN_PAYMENT, pmi_monthly_amt, OTHER_FIXED_PAYMENTS,
+            loan_interest_perc, loan_terms_years, APPRECIATION_PERC)
+    expected = reference_schedule(*args, start_date=START_DATE)
+    result = Amortizer(*args, start_date=START_DATE).schedule()
+
+    # Loan events added a column the loop never had, it stays 0 without events
+    assert (result.pop('Home Extra Principal Payment') == 0).all()
+    assert list(result.columns) == list(expected.columns)
+    assert (result['Date'] == expected['Date']).all()
+
+    months = np.arange(len(expected))
+    tolerance = rounding_tolerance(months, max(loan_interest_perc, APPRECIATION_PERC))
+    for column in expected.columns[1:]:
+        difference = np.abs(result[column].to_numpy() - expected[column].to_numpy())
+        assert (difference <= tolerance).all(), f"{column} is off by up to ${difference.max():.2f}"
+
+
+def test_schedule_without_interest_is_exact():
+    args = (HOME_PRICE, DOWN_PAYMENT, 250., OTHER_FIXED_PAYMENTS, 0., 15, 0.)
+    expected = reference_schedule(*args, start_date=START_DATE)
+    result = Amortizer(*args, start_date=START_DATE).schedule().drop(columns='Home Extra Principal Payment')
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_freq=False, atol=0.01)
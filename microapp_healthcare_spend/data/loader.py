@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
+import hashlib
 import os
 
 
@@ -9,9 +10,142 @@ import os
 file_repo = os.path.dirname(__file__)
 BLS_CPI_FILEPATH = os.path.join(file_repo, 'BLS CPI Dataset.xlsx')
 AGE_AND_SEX_FILEPATH = os.path.join(file_repo, 'Age and Sex dataset.csv')
+SOURCE_FILEPATHS = (BLS_CPI_FILEPATH, AGE_AND_SEX_FILEPATH)
 
-# @st.cache_data
-def load_data():
+# Processed long table, rebuilt whenever a source file changes. Bump the version when
+# the processing below changes so old snapshots aren't reused.
+SNAPSHOT_DIR = os.path.join(file_repo, '.cache')
+SNAPSHOT_FILEPATH = os.path.join(SNAPSHOT_DIR, 'health_spend.parquet')
+SNAPSHOT_VERSION = 2
+
+# The long table repeats each dimension value thousands of times, so the dimensions are
+# stored as categoricals. Age groups are ordered youngest to oldest, the other dimensions
+# alphabetically, values missing from AGE_GROUP_ORDER are placed after it.
+DIMENSION_COLUMNS = ('Payer', 'Service', 'Age Group', 'Sex')
+AGE_GROUP_ORDER = ('0-18', '19-44', '45-64', '65-84', '85+')
+SPEND_COLUMNS = ('Nominal Spend', 'Inflation_Adj_Spend')
+
+
+def source_fingerprint():
+    """
+    (file name, size, mtime) of every source file. Only stats the files, so it is cheap
+    enough to run on every rerun.
+    """
+    ret = []
+    for path in SOURCE_FILEPATHS:
+        stat = os.stat(path)
+        ret.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(ret)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _snapshot_sources(fingerprint):
+    """
+    Returns {file name: {size, mtime_ns, sha256}} describing the source files, hashing
+    them. Stored in the snapshot so it can be checked against the files later.
+    """
+    return {name: {'size': size, 'mtime_ns': mtime_ns, 'sha256': _file_hash(os.path.join(file_repo, name))}
+            for name, size, mtime_ns in fingerprint}
+
+
+def _snapshot_is_current(metadata, fingerprint):
+    """
+    The snapshot is current when every source has the same size and either the same
+    mtime or, when the mtime moved (ex: a fresh checkout), the same content hash
+    """
+    if metadata.get('version') != SNAPSHOT_VERSION:
+        return False
+    sources = metadata.get('sources', {})
+    for name, size, mtime_ns in fingerprint:
+        recorded = sources.get(name)
+        if recorded is None or recorded['size'] != size:
+            return False
+        if recorded['mtime_ns'] != mtime_ns and recorded['sha256'] != _file_hash(os.path.join(file_repo, name)):
+            return False
+    return True
+
+
+def read_snapshot(fingerprint):
+    """
+    The processed table from the on-disk snapshot, or None when there is no current one
+    """
+    try:
+        import json
+        import pyarrow.parquet as pq
+
+        # The footer alone holds the metadata, the table is only read once it checks out
+        metadata = json.loads(pq.read_schema(SNAPSHOT_FILEPATH).metadata[b'health_spend'])
+    except (ImportError, OSError, KeyError, TypeError, ValueError):
+        return None
+    if not _snapshot_is_current(metadata, fingerprint):
+        return None
+    try:
+        return pq.read_table(SNAPSHOT_FILEPATH).to_pandas()
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(df, fingerprint):
+    """
+    Saves the processed table with the source files it was built from. Written to a
+    temporary file first so a reader never sees half a snapshot. Skipped when pyarrow
+    is missing or the snapshot can't be written (ex: the folder isn't writable), the app
+    then keeps the table parsed from the sources.
+    """
+    try:
+        import json
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return
+
+    temporary = f'{SNAPSHOT_FILEPATH}.{os.getpid()}.tmp'
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = {'version': SNAPSHOT_VERSION, 'sources': _snapshot_sources(fingerprint)}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               b'health_spend': json.dumps(metadata).encode()})
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        pq.write_table(table, temporary, compression='zstd')
+        os.replace(temporary, SNAPSHOT_FILEPATH)
+    except (pa.ArrowException, OSError):
+        # Don't leave a half written file next to the snapshot
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def _categories(values, known_order=()):
+    return list(known_order) + sorted(set(values).difference(known_order))
+
+
+def compact_schema(df, spend_dtype=None):
+    """
+    Dimension columns as ordered categoricals, Year as int16 and, with spend_dtype (ex:
+    'float32'), the spend columns converted to it. Spend keeps its dtype by default.
+    """
+    dtypes = {col: pd.CategoricalDtype(_categories(df[col].unique(), AGE_GROUP_ORDER if col == 'Age Group' else ()),
+                                       ordered=True)
+              for col in DIMENSION_COLUMNS}
+    dtypes['Year'] = np.int16
+    if spend_dtype is not None:
+        dtypes.update({col: spend_dtype for col in SPEND_COLUMNS})
+    return df.astype(dtypes)
+
+
+def process_sources():
+    """
+    Parses the source files into the long table, the slow path (reading the Excel file
+    with openpyxl and melting every year column)
+    """
     cpi_df = (
         pd.read_excel(BLS_CPI_FILEPATH, skiprows=11)
         .assign(
@@ -30,17 +164,82 @@ def load_data():
                             & (df['Service'] != 'Total Personal Health Care')
                             ] )
         .melt(id_vars=['Payer', 'Service', 'Age Group', 'Sex'],
-            value_vars=[str(i) for i in range(2002, 2022, 2)], 
-            value_name='Nominal Spend', 
+            value_vars=[str(i) for i in range(2002, 2022, 2)],
+            value_name='Nominal Spend',
             var_name='Year')
         .astype({'Year': int})
         .merge(cpi_df, how='left', on='Year')
         .assign(
             CPI_2020 = cpi_df[cpi_df['Year'] == 2020]['AVG_CPI'].values[0],
             Inflation_Adj_Spend = lambda df: df['Nominal Spend'] / (df['AVG_CPI'] / df['CPI_2020']),
-        ) 
+        )
 
         .filter(items=['Year', 'Payer', 'Service', 'Age Group', 'Sex', 'Nominal Spend', 'Inflation_Adj_Spend'])
+        .pipe(compact_schema)
     )
 
-    return health_spend_df
\ No newline at end of file
+    return health_spend_df
+
+
+# First level: one copy per server process, shared by every session. Keyed by the
+# source fingerprint, so changed files get a new entry instead of a stale one.
+@st.cache_data(max_entries=2, show_spinner=False)
+def _load_data(fingerprint, spend_dtype=None):
+    # Second level: the on-disk snapshot, which survives restarts
+    df = read_snapshot(fingerprint)
+    if df is None:
+        df = process_sources()
+        write_snapshot(df, fingerprint)
+    if spend_dtype is not None:
+        df = df.astype({col: spend_dtype for col in SPEND_COLUMNS})
+    return df
+
+
+def load_data(spend_dtype=None):
+    """
+    The long table in its compact schema (see compact_schema). spend_dtype='float32'
+    halves the spend columns, sums then carry float32 rounding.
+    """
+    return _load_data(source_fingerprint(), None if spend_dtype is None else np.dtype(spend_dtype).name)
+
+
+# Dimensions the line chart can split the totals by, and for each spend choice the
+# column summed and the name of the total
+HUE_DIMENSIONS = ('Payer', 'Age Group', 'Service', 'Sex')
+SPEND_TOTALS = {
+    'Nominal': ('Nominal Spend', 'Total_Nominal_Spend'),
+    'Adjusted': ('Inflation_Adj_Spend', 'Total_Adjusted_Spend'),
+}
+
+
+def build_aggregate_cube(df):
+    """
+    Every frame the line chart can show, keyed by (spend choice, hue dimension or None):
+    yearly totals, and yearly totals by each dimension, in $ billions (spend is in $ millions).
+    One groupby per dimension sums both spend columns at once. Dimension columns stay
+    categorical, so hues keep the category order (ex: age groups youngest first).
+    """
+    ret = {}
+    for hue in (None,) + HUE_DIMENSIONS:
+        group_by_cols = ['Year'] if hue is None else ['Year', hue]
+        totals = (
+            df
+            .groupby(by=group_by_cols, as_index=False, observed=True)
+            .agg(**{agg_col: (spend_col, 'sum') for spend_col, agg_col in SPEND_TOTALS.values()})
+        )
+        for spend, (_, agg_col) in SPEND_TOTALS.items():
+            display_df = totals[group_by_cols + [agg_col]].astype({'Year': int, agg_col: float})
+            display_df[agg_col] = display_df[agg_col] / 1_000
+            ret[(spend, hue)] = display_df
+    return ret
+
+
+# Built once per process and source fingerprint. cache_resource hands out the same dict
+# instead of a copy, so a widget change costs a lookup. The frames are read only.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _load_aggregate_cube(fingerprint):
+    return build_aggregate_cube(_load_data(fingerprint))
+
+
+def load_aggregate_cube():
+    return _load_aggregate_cube(source_fingerprint())
@@ -1,5 +1,5 @@
 import streamlit as st
-from data.loader import load_data
+from data.loader import HUE_DIMENSIONS, SPEND_TOTALS, load_aggregate_cube
 
 import seaborn as sns
 import matplotlib.pyplot as plt
@@ -9,38 +9,21 @@ import matplotlib.ticker as ticker
 
 
 def show_linechart_page():
-    df = load_data()
+    # Every total the chart can show is aggregated once at load, see build_aggregate_cube
+    cube = load_aggregate_cube()
 
-    #Initilization
-    if 'dataframe' not in st.session_state:
-        st.session_state['dataframe'] = df
-
-    NOM_OR_ADJ = st.radio(label='Nominal or Adjusted Spend?', options=['Nominal', 'Adjusted'])
+    NOM_OR_ADJ = st.radio(label='Nominal or Adjusted Spend?', options=list(SPEND_TOTALS))
 
     
     HUE_VAR = st.selectbox(label='Hue (Legend) Variable', 
-                           options=[None, 'Payer', 'Age Group', 'Service', 'Sex'],
+                           options=[None, *HUE_DIMENSIONS],
                            index=0)
 
-    spend_col = 'Nominal Spend' if NOM_OR_ADJ == 'Nominal' else 'Inflation_Adj_Spend'
-    agg_col = 'Total_Nominal_Spend' if NOM_OR_ADJ == 'Nominal' else 'Total_Adjusted_Spend'
+    agg_col = SPEND_TOTALS[NOM_OR_ADJ][1]
     title_plot = 'Total Spend Over Time' + (' (Nominal Spend)' if NOM_OR_ADJ == 'Nominal' else ' (Adjusted for Inflation)')
 
-    group_by_cols = ['Year']
-
-    if HUE_VAR:
-        group_by_cols.append(HUE_VAR)
-
-    display_df = (
-        st.session_state['dataframe']
-        .groupby(by=group_by_cols, as_index=False)
-        .agg(**{agg_col: (spend_col, 'sum')})
-        .astype({'Year': int,
-                agg_col: float})
-    )
-    display_df[agg_col] = display_df[agg_col] / 1_000
+    display_df = cube[(NOM_OR_ADJ, HUE_VAR)]
     
-    cols = display_df.columns.tolist()
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.pointplot(data=display_df, x='Year', y=agg_col, hue=HUE_VAR, ax=ax, errorbar=None)
     